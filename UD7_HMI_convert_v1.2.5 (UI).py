@@ -7,27 +7,50 @@ Version：v1.2.5
 """
 
 import os
+import io
+import gc
+import sys
+import re
 import csv
-
-import matplotlib
-import matplotlib.pyplot as plt
-from matplotlib.dates import DateFormatter
-matplotlib.use('Qt5Agg') # 指定互動式後端
+import json
+import contextlib
+import cProfile
+import glob
+import time
+import queue
+import hashlib
+import logging
+import shutil
+import argparse
+import platform
+import tempfile
+import threading
+import tracemalloc
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import islice
+
+import numpy as np
 
 from datetime import datetime, timedelta
-from tkcalendar import DateEntry
 
 import openpyxl
 from openpyxl import Workbook
 from openpyxl.chart import LineChart, Reference, Series
 from openpyxl.drawing.text import ParagraphProperties, CharacterProperties
 from openpyxl.drawing.line import LineProperties
+from openpyxl.chart.shapes import GraphicalProperties
+from openpyxl.worksheet.hyperlink import Hyperlink
+from openpyxl.utils import get_column_letter
+from openpyxl.cell import Cell, WriteOnlyCell
 
-import tkinter as tk
-from tkinter import ttk, filedialog, messagebox
+# GUI相關套件 (tkinter / tkcalendar / matplotlib) 於 Load_GUI() 載入，命令列模式不需要
 
 # 主程式模組---------------------------------------------------------------------------------------
 
+# 紀錄 (命令列模式於 CLI_main 設定輸出；GUI未設定時警告以上輸出至主控台)
+log = logging.getLogger("UD7_HMI")
+
 # 11種線型
 linetypes = ("solid","sysDash", "sysDashDot", "sysDashDotDot", "sysDot",
              "dash", "dashDot", "dot", "lgDash", "lgDashDot", "lgDashDotDot",)
@@ -51,10 +74,220 @@ StopCommand  = "User operation: User Send Stop UD7 Command."
 UD7Alarm     = "UD7 Alarm"
 Mode_changed = "Mode/Status changed to: UD7_Stutas_Ready"
 
+# 背景工作已取消
+class Task_Cancelled(Exception):
+    pass
+
+# 背景工作進度與取消控制
+class Task_Control:
+    def __init__(self):
+        self.cancel_event = threading.Event()
+        self.done_event   = threading.Event()
+        self.messages     = queue.Queue()
+        self.result       = None
+        self.error        = None
+    
+    # 回報進度，並檢查是否已取消 (階段, 完成數量, 總數量)
+    def update(self, stage, done = 0, total = 0):
+        self.check()
+        self.messages.put((stage, done, total))
+    
+    # 已取消時中止工作
+    def check(self):
+        if self.cancel_event.is_set():
+            raise Task_Cancelled()
+    
+    # 取消工作
+    def cancel(self):
+        self.cancel_event.set()
+    
+    # 工作結束 (結果, 錯誤)
+    def finish(self, result = None, error = None):
+        self.result = result
+        self.error  = error
+        self.done_event.set()
+    
+    @property
+    def finished(self):
+        return self.done_event.is_set()
+    
+    # 取出尚未顯示的進度
+    def updates(self):
+        while True:
+            try:
+                yield self.messages.get_nowait()
+            except queue.Empty:
+                return
+
+# 效能紀錄模式：time 各階段耗時與計數 / memory 各階段記憶體峰值 (tracemalloc，較慢) / cprofile 函式剖析
+# 環境變數 UD7_PROFILE 以逗號分隔 (例如 time,memory)，設為 1 等同 time，預設停用
+Profile_modes = ["time", "memory", "cprofile"]
+
+# 目前執行中的效能紀錄 (None = 停用)
+Profile_current = None
+
+# 效能紀錄模式參數 (文字) → 模式清單
+def Profile_arg(text):
+    modes = ["time" if mode == "1" else mode for mode in (item.strip().lower() for item in (text or "").split(",")) if mode not in ("", "0")]
+    for mode in modes:
+        if mode not in Profile_modes:
+            raise argparse.ArgumentTypeError(f"未知的效能紀錄模式：{mode} (可選：{', '.join(Profile_modes)})")
+    return modes
+
+# 單次執行的效能紀錄：各階段累計耗時/次數/記憶體峰值，以及計數器 (模式清單)
+class Run_Profile:
+    def __init__(self, modes):
+        self.modes    = modes
+        self.stages   = OrderedDict()
+        self.counters = OrderedDict()
+        self.lock     = threading.Lock()
+        self.local    = threading.local() # 各執行緒的階段堆疊 (巢狀階段)
+        self.begin    = time.perf_counter()
+        
+        # 已在記錄時 (例如效能測試) 不重複啟動
+        self.memory = "memory" in modes and not tracemalloc.is_tracing()
+        if self.memory:
+            tracemalloc.start()
+        
+        self.profiler = None
+        if "cprofile" in modes:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+    
+    # 階段計時 (階段名稱)，巢狀階段的耗時包含在外層階段內
+    @contextlib.contextmanager
+    def stage(self, name):
+        stack  = self.local.__dict__.setdefault("stack", [])
+        memory = tracemalloc.is_tracing() and hasattr(tracemalloc, "reset_peak") # Python 3.9 以上才有各階段峰值
+        
+        # 記憶體峰值：保留外層目前的峰值後重設，結束時再回報給外層
+        start = 0
+        if memory:
+            start, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1][1] = max(stack[-1][1], peak)
+            tracemalloc.reset_peak()
+        frame = [start, 0]
+        stack.append(frame)
+        
+        begin = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - begin
+            stack.pop()
+            
+            with self.lock:
+                stage = self.stages.setdefault(name, {"calls": 0, "seconds": 0.0})
+                stage["calls"]   += 1
+                stage["seconds"] += seconds
+                
+                if memory:
+                    peak = max(frame[1], tracemalloc.get_traced_memory()[1])
+                    stage["peak_mb"] = max(stage.get("peak_mb", 0.0), (peak - frame[0]) / 1048576)
+                    if stack:
+                        stack[-1][1] = max(stack[-1][1], peak)
+    
+    # 累加計數器 (名稱, 數量)
+    def count(self, name, n = 1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+    
+    # 結束記錄，報告與剖析檔存於輸出檔旁 (輸出檔路徑) → 報告檔路徑
+    def finish(self, save_path):
+        if self.profiler is not None:
+            self.profiler.disable()
+        
+        base   = os.path.splitext(save_path)[0]
+        report = {"created":  datetime.now().isoformat(timespec = "seconds"),
+                  "output":   save_path,
+                  "modes":    self.modes,
+                  "seconds":  round(time.perf_counter() - self.begin, 3),
+                  "stages":   {name: {key: round(value, 3) if isinstance(value, float) else value for key, value in stage.items()}
+                               for name, stage in self.stages.items()},
+                  "counters": dict(self.counters),
+                  "files":    {}}
+        
+        # 配置最多的程式位置
+        allocations = None
+        if self.memory:
+            report["peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 1048576, 1)
+            allocations = tracemalloc.take_snapshot().statistics("lineno")[:50]
+            tracemalloc.stop()
+        
+        if allocations is not None:
+            report["files"]["memory"] = base + "_Profile_memory.txt"
+            with open(report["files"]["memory"], "w", encoding = "utf-8") as file:
+                file.writelines(f"{stat}\n" for stat in allocations)
+        
+        if self.profiler is not None:
+            report["files"]["cprofile"] = base + "_Profile.prof"
+            self.profiler.dump_stats(report["files"]["cprofile"])
+        
+        save_path = base + "_Profile.json"
+        with open(save_path, "w", encoding = "utf-8") as file:
+            json.dump(report, file, ensure_ascii = False, indent = 2)
+        
+        # 依耗時排列
+        log.info("效能紀錄：共 %.3f 秒", report["seconds"])
+        for name, stage in sorted(report["stages"].items(), key = lambda item: -item[1]["seconds"]):
+            log.info("  %-16s %9.3f 秒 %6d 次%s", name, stage["seconds"], stage["calls"], f" {stage['peak_mb']:9.1f} MB" if "peak_mb" in stage else "")
+        for name, value in report["counters"].items():
+            log.info("  %-16s %d", name, value)
+        return save_path
+
+# 開始效能紀錄 (模式清單，None為環境變數 UD7_PROFILE) → 效能紀錄 / None
+def Profile_start(modes = None):
+    global Profile_current
+    if modes is None:
+        try:
+            modes = Profile_arg(os.environ.get("UD7_PROFILE", ""))
+        except argparse.ArgumentTypeError as e:
+            log.warning("UD7_PROFILE：%s", e)
+            modes = []
+    
+    Profile_current = Run_Profile(modes) if modes else None
+    return Profile_current
+
+# 結束效能紀錄 (輸出檔路徑) → 報告檔路徑 / None
+def Profile_finish(save_path):
+    global Profile_current
+    profile, Profile_current = Profile_current, None
+    if profile is None:
+        return None
+    
+    try:
+        return profile.finish(save_path)
+    except OSError as e:
+        log.warning("無法儲存效能紀錄：%s", e)
+        return None
+
+# 階段計時 (階段名稱)，停用時不做任何事
+def Profile_stage(name):
+    return Profile_current.stage(name) if Profile_current is not None else contextlib.nullcontext()
+
+# 累加計數器 (名稱, 數量)
+def Profile_count(name, n = 1):
+    if Profile_current is not None:
+        Profile_current.count(name, n)
+
+# 產生器逐項取值計時 (階段名稱, 產生器) → 依序產生項目，取值時間不含使用端的處理時間
+Profile_end = object()
+
+def Profile_iter(name, items):
+    items = iter(items)
+    while True:
+        with Profile_stage(name):
+            item = next(items, Profile_end)
+        if item is Profile_end:
+            return
+        yield item
+
 # 讀取檔案 (路徑, 檔案類型)
 def get_files_in_dir(f_path):
     # 取得目前目錄中的所有檔案名
-    files = os.listdir(f_path)
+    with Profile_stage("File_list"):
+        files = os.listdir(f_path)
     
     # 篩選出.csv結尾的檔名，並將它們儲存到清單中
     files_csv = [filename for filename in files if filename.endswith(".csv") or filename.endswith(".CSV")]
@@ -63,121 +296,1104 @@ def get_files_in_dir(f_path):
     files = files_csv
     
     if len(files) == 0:
-        messagebox.showerror("錯誤", "⚠️資料夾路徑下，沒有.CSV檔存在！")
+        log.warning("資料夾路徑下，沒有.CSV檔存在：%s", f_path)
 
     return files
 
+# 整數欄位壓縮 (整數陣列)
+def compact_int(values):
+    for dtype in (np.int16, np.int32):
+        info = np.iinfo(dtype)
+        if len(values) == 0 or (values.min() >= info.min and values.max() <= info.max):
+            return values.astype(dtype)
+    return values
+
+# 文字欄位轉整數，空白或非數字為0 (文字清單)
+def column_int(texts):
+    texts = np.array(texts, dtype = str)
+    texts[texts == ""] = "0"
+    try:
+        values = texts.astype(np.int64)
+    except ValueError:
+        values = np.array([int(t) if t.lstrip("-").isdigit() else 0 for t in texts], dtype = np.int64)
+    return compact_int(values)
+
+# 時間格式
+Time_format = "%Y-%m-%d %H:%M:%S.%f"
+
+# 整批解析時間字串 (文字清單) → datetime64[ms]
+def Parse_timestamps(texts):
+    with Profile_stage("Parse_timestamps"):
+        try:
+            # numpy可直接解析 "YYYY-MM-DD HH:MM:SS.fff"，整欄一次轉換
+            time = np.array(texts, dtype = "datetime64[ms]")
+        except ValueError:
+            # 非固定位數格式 (例如小時只有1位數)，逐筆解析
+            time = np.array([datetime.strptime(t, Time_format) for t in texts], dtype = "datetime64[ms]")
+
+    # 空白或NaT視為格式錯誤
+    if len(time) > 0 and np.isnat(time).any():
+        bad = texts[int(np.argmax(np.isnat(time)))]
+        raise ValueError(f"time data {bad!r} does not match format {Time_format!r}")
+
+    return time
+
+# datetime64時間轉文字 "YYYY-MM-DD HH:MM:SS.fff" (datetime64時間)
+def Time_text(Timestamp):
+    return np.datetime_as_string(Timestamp, unit = "ms").replace("T", " ")
+
+# 欄位式資料表 (標題列/時間/描述代碼/描述類別/VFB/IFB/FREQ)
+class UD7_Table:
+    def __init__(self, header, time, desc, categories, VFB, IFB, FREQ):
+        self.header     = header     # CSV標題列
+        self.time       = time       # datetime64[ms]
+        self.desc       = desc       # Description類別代碼
+        self.categories = categories # Description類別文字
+        self.VFB        = VFB
+        self.IFB        = IFB
+        self.FREQ       = FREQ
+
+    def __len__(self):
+        return len(self.time)
+
+    # 由CSV資料列建立 (標題列, 資料列)
+    @classmethod
+    def from_rows(cls, header, rows):
+        # 描述欄位轉類別代碼
+        lookup = {}
+        desc = np.array([lookup.setdefault(row[5], len(lookup)) for row in rows], dtype = np.int64)
+        categories = list(lookup)
+
+        # 時間欄位
+        time = Parse_timestamps([row[1] for row in rows])
+
+        VFB  = column_int([row[6] for row in rows])
+        IFB  = column_int([row[7] for row in rows])
+        FREQ = column_int([row[8] for row in rows])
+
+        return cls(header, time, compact_int(desc), categories, VFB, IFB, FREQ)
+
+    # 空資料表 (標題列)
+    @classmethod
+    def empty(cls, header = None):
+        return cls.from_rows(header or [], [])
+
+    # 合併資料表 (資料表清單)
+    @classmethod
+    def concat(cls, tables):
+        if len(tables) == 0:
+            return cls.empty()
+
+        # 合併描述類別，並重新對應代碼
+        lookup = {}
+        codes = []
+        for table in tables:
+            remap = np.array([lookup.setdefault(c, len(lookup)) for c in table.categories], dtype = np.int64)
+            codes.append(remap[table.desc] if len(remap) > 0 else np.zeros(0, dtype = np.int64))
+
+        return cls(tables[0].header,
+                   np.concatenate([table.time for table in tables]),
+                   compact_int(np.concatenate(codes)),
+                   list(lookup),
+                   compact_int(np.concatenate([table.VFB  for table in tables])),
+                   compact_int(np.concatenate([table.IFB  for table in tables])),
+                   compact_int(np.concatenate([table.FREQ for table in tables])))
+
+    # 取出部分資料 (索引陣列/切片)
+    def take(self, index):
+        return UD7_Table(self.header, self.time[index], self.desc[index], self.categories,
+                         self.VFB[index], self.IFB[index], self.FREQ[index])
+
+    # 資料時間字串 (資料位置)
+    def time_str(self, i):
+        return Time_text(self.time[i])
+
+# 判斷是否為UD7監控資料開頭 (標題列)
+def is_UD7_header(header):
+    return header is not None and ("FREQ" in header or "IFB" in header or "VFB" in header)
+
+# 解析單行CSV (位元組資料) → 資料列
+def CSV_Line(line):
+    return next(csv.reader([line.decode('utf-8')]), [])
+
+# 檔案時間範圍快取 {(路徑, 大小, 修改時間): 時間範圍}
+CSV_extents = {}
+
+# 讀取檔案開頭與結尾，取得檔案時間範圍 (檔案路徑) → 時間範圍 / None
+def CSV_Extent(file_path, tail_bytes = 8192):
+    stat = os.stat(file_path)
+    key  = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+    if key in CSV_extents:
+        return CSV_extents[key]
+    
+    extent = None
+    with open(file_path, 'rb') as file:
+        # 開頭：標題列與第一筆資料
+        lines  = (line for line in file if line.strip())
+        header = CSV_Line(next(lines, b""))
+        first  = next(lines, None)
+        data_start = file.tell() - len(first) if first is not None else None
+        
+        if is_UD7_header(header) and first is not None:
+            # 結尾：由檔案最後往前讀取，直到取得完整的最後一筆資料
+            size = stat.st_size
+            block = tail_bytes
+            while True:
+                file.seek(max(size - block, 0))
+                tail = file.read()
+                lines = [line for line in tail.splitlines() if line.strip()]
+                if len(lines) >= 2 or block >= size:
+                    break
+                block *= 2
+            
+            first_row = CSV_Line(first)
+            last_row  = CSV_Line(lines[-1])
+            first_time, last_time = Parse_timestamps([first_row[1], last_row[1]])
+            
+            # 以結尾資料的平均長度估計資料筆數 (第一行可能不完整)
+            sample = lines[1:] if block < size and len(lines) > 1 else lines
+            line_bytes = max(sum(len(line) for line in sample) / len(sample), 1) + 1
+            
+            extent = {"path":       file_path,
+                      "size":       size,
+                      "header":     header,
+                      "data_start": data_start,
+                      "rows":       max(int(round((size - data_start) / line_bytes)), 1),
+                      "first":      first_time,
+                      "last":       last_time}
+    
+    CSV_extents[key] = extent
+    return extent
+
+# 建立資料夾內檔案時間範圍索引 (路徑) → 時間範圍清單 (依檔案開頭時間排序)
+def CSV_Index(f_path):
+    index = []
+    for f in get_files_in_dir(f_path):
+        extent = CSV_Extent(os.path.join(f_path, f))
+        if extent is not None:
+            index.append(extent)
+    
+    # 檔案依時間順序合併，標題列取第一個檔案
+    index.sort(key = lambda extent: extent["first"])
+    return index
+
+# 快速探測資料夾，只讀取各檔案開頭與結尾 (路徑) → 資料夾資訊 / None
+def CSV_Probe(f_path):
+    index = CSV_Index(f_path)
+    if len(index) == 0:
+        return None
+    
+    return {"first":    min(extent["first"] for extent in index),
+            "last":     max(extent["last"]  for extent in index),
+            "files":    len(index),
+            "rows":     sum(extent["rows"] for extent in index),
+            "channels": [name for name in data_units if any(name in extent["header"] for extent in index)]}
+
+# 二分搜尋檔案內第一筆不早於起始時間的資料位置 (時間範圍, 起始時間) → 檔案位置
+# HMI監控資料依時間順序寫入，檔案內時間為遞增
+def CSV_Seek(extent, Start_time, block = 65536):
+    Start_time = np.datetime64(Start_time, "ms")
+    lo, hi = extent["data_start"], extent["size"]
+    
+    with open(extent["path"], 'rb') as file:
+        while hi - lo > block:
+            mid = (lo + hi) // 2
+            
+            # 跳到下一行開頭
+            file.seek(mid)
+            file.readline()
+            line = file.readline()
+            
+            if line.strip() and Parse_timestamps([CSV_Line(line)[1]])[0] < Start_time:
+                lo = file.tell()
+            else:
+                hi = mid
+    return lo
+
+# 逐段讀取單一檔案 (檔案路徑, 每段列數, 開始讀取位置) → 依序產生資料表
+def CSV_Chunks(file_path, chunk_rows = 20000, offset = None):
+    with open(file_path, 'rb') as raw:
+        file = io.TextIOWrapper(raw, encoding = 'utf-8', newline = '')
+        reader = csv.reader(file)
+        rows = (row for row in reader if row)
+        
+        # 判斷檔案開頭
+        header = next(rows, None)
+        if not is_UD7_header(header):
+            return
+        
+        # 由指定位置開始讀取
+        if offset is not None:
+            file.detach()
+            raw.seek(offset)
+            file = io.TextIOWrapper(raw, encoding = 'utf-8', newline = '')
+            reader = csv.reader(file)
+            rows = (row for row in reader if row)
+        
+        # 消除開頭，每段轉為欄位式資料
+        while True:
+            with Profile_stage("CSV_parse"):
+                chunk = list(islice(rows, chunk_rows))
+                table = UD7_Table.from_rows(header, chunk) if chunk else None
+            if table is None:
+                break
+            yield table
+
+# 解析資料快取 (快取資料夾 / 容量上限)，快取資料夾設為空字串即停用
+Cache_dir     = os.environ.get("UD7_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".UD7_HMI_cache"))
+Cache_limit   = int(os.environ.get("UD7_CACHE_MB", "1024")) * 1024 * 1024
+Cache_version = 1
+
+# 快取檔名 (時間範圍) → 檔案路徑前綴, 快取檔案路徑
+def Cache_path(extent):
+    stat = os.stat(extent["path"])
+    name = hashlib.sha1(os.path.abspath(extent["path"]).encode("utf-8")).hexdigest()[:16]
+    key  = hashlib.sha1(f"{Cache_version}|{stat.st_size}|{stat.st_mtime_ns}".encode("utf-8")).hexdigest()[:12]
+    return name, os.path.join(Cache_dir, f"{name}_{key}.npz")
+
+# 讀取快取 (時間範圍) → 資料表 / None
+def Cache_load(extent):
+    try:
+        name, path = Cache_path(extent)
+        if not os.path.exists(path):
+            return None
+        
+        with np.load(path, allow_pickle = False) as cache:
+            table = UD7_Table(cache["header"].tolist(),
+                              cache["time"].view("datetime64[ms]"),
+                              cache["desc"],
+                              cache["categories"].tolist(),
+                              cache["VFB"],
+                              cache["IFB"],
+                              cache["FREQ"])
+        
+        # 更新使用時間 (淘汰順序)
+        os.utime(path)
+        return table
+    
+    except Exception as e:
+        print("讀取快取時，發生錯誤：", e)
+        return None
+
+# 寫入快取，並刪除同一檔案的舊快取 (時間範圍, 資料表)
+def Cache_store(extent, table):
+    try:
+        os.makedirs(Cache_dir, exist_ok = True)
+        name, path = Cache_path(extent)
+        
+        # 先寫入暫存檔再取代，避免中斷時留下不完整的快取
+        temp = path + ".tmp"
+        with open(temp, "wb") as file:
+            np.savez_compressed(file,
+                                header     = np.array(table.header, dtype = str),
+                                time       = table.time.view(np.int64),
+                                desc       = table.desc,
+                                categories = np.array(table.categories, dtype = str),
+                                VFB        = table.VFB,
+                                IFB        = table.IFB,
+                                FREQ       = table.FREQ)
+        os.replace(temp, path)
+        
+        for f in os.listdir(Cache_dir):
+            if f.startswith(name + "_") and os.path.join(Cache_dir, f) != path:
+                os.remove(os.path.join(Cache_dir, f))
+        
+        Cache_evict()
+        
+    except Exception as e:
+        print("寫入快取時，發生錯誤：", e)
+
+# 快取超過容量上限時，刪除最久未使用的快取
+def Cache_evict():
+    caches = []
+    for f in os.listdir(Cache_dir):
+        if f.endswith(".npz"):
+            stat = os.stat(os.path.join(Cache_dir, f))
+            caches.append((stat.st_mtime, stat.st_size, os.path.join(Cache_dir, f)))
+    
+    total = sum(size for _, size, _ in caches)
+    for _, size, path in sorted(caches):
+        if total <= Cache_limit:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass # 其他行程已刪除
+        total -= size
+
+# 讀取單一檔案資料表，並寫入快取 (時間範圍) → 資料表
+def CSV_Load(extent):
+    table = Cache_load(extent)
+    if table is None:
+        table = UD7_Table.concat(list(CSV_Chunks(extent["path"])))
+        Cache_store(extent, table)
+    return table
+
+# 讀取單一檔案 (時間範圍, 起始時間) → 依序產生資料表
+def CSV_Tables(extent, Start_time = None):
+    if Cache_dir:
+        # 有快取時整檔讀取，再跳到起始時間
+        table = CSV_Load(extent)
+        if Start_time is not None:
+            table = table.take(slice(np.searchsorted(table.time, np.datetime64(Start_time, "ms")), None))
+        yield table
+        
+    else:
+        # 起始時間落在檔案中間，直接跳到起始時間附近
+        offset = CSV_Seek(extent, Start_time) if Start_time is not None else None
+        yield from CSV_Chunks(extent["path"], offset = offset)
+
+# 平行解析行程數 (0 = CPU核心數)
+Workers = int(os.environ.get("UD7_WORKERS", "0"))
+
+# 子行程：解析單一檔案 (時間範圍, 起始時間) → 資料表
+def CSV_Parse(extent, Start_time = None):
+    return UD7_Table.concat(list(CSV_Tables(extent, Start_time)))
+
+# 多行程預先解析檔案，依檔案順序取出結果 (時間範圍清單, 起始時間清單, 行程數)
+class CSV_Prefetcher:
+    def __init__(self, extents, seek_times, workers = None):
+        workers = workers if workers is not None else Workers
+        workers = workers if workers > 0 else (os.cpu_count() or 1)
+        
+        # 需要解析的檔案 (已有快取的檔案直接讀取較快)
+        self.jobs = [(extent, seek) for extent, seek in zip(extents, seek_times)
+                     if not (Cache_dir and os.path.exists(Cache_path(extent)[1]))]
+        self.futures  = {}
+        self.executor = None
+        
+        if workers > 1 and len(self.jobs) > 1:
+            self.executor = ProcessPoolExecutor(max_workers = min(workers, len(self.jobs)))
+            self.ahead = workers * 2 # 最多預先解析的檔案數
+            self.submit()
+            Profile_count("csv_files_subprocess", len(self.jobs) + len(self.futures))
+    
+    # 送出下一批解析工作
+    def submit(self):
+        while self.jobs and len(self.futures) < self.ahead:
+            extent, seek = self.jobs.pop(0)
+            self.futures[extent["path"]] = (seek, self.executor.submit(CSV_Parse, extent, seek))
+    
+    # 取得單一檔案資料表 (時間範圍, 起始時間) → 依序產生資料表
+    def tables(self, extent, Start_time = None):
+        if extent["path"] in self.futures:
+            seek, future = self.futures.pop(extent["path"])
+            self.submit()
+            
+            # 預先解析時使用相同起始時間才可直接使用
+            if seek == Start_time:
+                yield future.result()
+                return
+            future.cancel()
+        
+        yield from CSV_Tables(extent, Start_time)
+    
+    # 結束子行程
+    def close(self):
+        if self.executor is not None:
+            for seek, future in self.futures.values():
+                future.cancel()
+            self.executor.shutdown(wait = False)
+            self.executor = None
+
+# 逐檔讀取資料 (路徑, 行程數) → 依序產生資料表
+def CSV_Stream(f_path, workers = None):
+    index = CSV_Index(f_path)
+    prefetcher = CSV_Prefetcher(index, [None] * len(index), workers)
+    try:
+        for extent in index:
+            yield from prefetcher.tables(extent)
+    finally:
+        prefetcher.close()
+
 # 讀取並合併資料 (路徑)
 def CSV_Merge(f_path):
+    tables = []
     try:
-        # 取得文件名列表
-        file_list = get_files_in_dir(f_path)
-        
         # 讀取並合併資料
-        Ori_data = []
-        for f in file_list:
-            with open(os.path.join(f_path, f), 'r', newline = '', encoding = 'utf-8') as file:
-                reader = csv.reader(file)
-                rows = [row for row in reader if row]
-            
-            if "FREQ" in rows[0] or "IFB" in rows[0] or "VFB" in rows[0]:
-                # 消除開頭
-                if file_list.index(f) > 0:
-                    del rows[0]
-                    
-                # 合併資料
-                Ori_data += rows
-        #print(Ori_data)
+        for table in CSV_Stream(f_path):
+            tables.append(table)
+                
     except Exception as e:
         print(e)
         
+    # 合併資料
+    Ori_data = UD7_Table.concat(tables)
     return Ori_data
 
-# UD7_HMI資料處理 (路徑, 起始時間, 終止時間)
-def UD7_HMI(f_path, Start_time, End_time):
-    # 儲存全部資料用
-    all_data = []
-    ws_titles = []
+# 事件種類
+Track_other, Track_start, Track_data, Track_stop, Track_alarm, Track_mode = range(6)
+
+# 追頻結束原因 (結束事件 → 說明)，None為資料結束時仍在追頻
+Track_end_names = {Track_stop: "停止命令", Track_alarm: "警報", Track_start: "未正常關閉", Track_mode: "模式切換", None: "資料結束"}
+
+# 會產生錯誤訊息的結束事件
+Track_error_kinds = (Track_alarm, Track_start, Track_mode)
+
+# Description事件種類 (描述文字)
+def Description_kind(Description):
+    if Description == StartTrack:
+        return Track_start
+    elif Description == ModeStatus52:
+        return Track_data
+    elif Description == StopCommand:
+        return Track_stop
+    elif Description[0:9] == UD7Alarm:
+        return Track_alarm
+    elif Description == Mode_changed:
+        return Track_mode
+    return Track_other
+
+# 每筆資料事件種類 (資料表)
+def Event_kinds(Ori_data):
+    category_kinds = np.array([Description_kind(c) for c in Ori_data.categories] + [Track_other], dtype = np.int8)
+    return category_kinds[Ori_data.desc]
+
+# 追頻分頁名稱 (datetime64時間)
+def Track_title(Timestamp):
+    Timestamp = np.datetime_as_string(Timestamp, unit = "s")
+    Timestamp = Timestamp[0:10] + str("_") + Timestamp[11:13] + str(".") + Timestamp[14:16] + str(".") + Timestamp[17:19]
+    return f"Track_{Timestamp}"
+
+# 取出追頻資料 (資料表, 資料位置)
+def Track_columns(Ori_data, index):
+    return {"Timestamp": Ori_data.time[index],
+            "FREQ": Ori_data.FREQ[index],
+            "IFB":  Ori_data.IFB[index],
+            "VFB":  Ori_data.VFB[index]}
+
+# 單次掃描追頻切分器，可分段輸入資料表 (起始時間, 終止時間)
+class Track_Segmenter:
+    def __init__(self, Start_time, End_time):
+        self.Start_time = np.datetime64(Start_time, "ms")
+        self.End_time   = np.datetime64(End_time, "ms")
+        
+        # 儲存全部資料用
+        self.all_data  = []
+        self.ws_titles = []
+        
+        # 儲存錯誤位置 / 各組追頻的結束事件
+        self.UD7_Error = []
+        self.end_kinds = []
+        
+        # 狀態：目前追頻資料片段 / 資料最後一項的下一項時間 / 等待下一段資料
+        self.header     = None
+        self.track      = None
+        self.next_time  = None
+        self.next_wait  = False
+        self.title_wait = None
     
-    # 儲存錯誤位置
-    UD7_Error = []
+    # 追頻是否進行中
+    @property
+    def active(self):
+        return self.track is not None
     
-    try:
-        # 讀取並合併資料
-        Ori_data = CSV_Merge(f_path)
-
-        # 計算起始追頻點
-        StartTrack_point = []
-        for i1 in range(1, len(Ori_data)):
+    # 輸入一段資料表 (資料表)
+    def feed(self, Ori_data):
+        if self.header is None:
+            self.header = Ori_data.header
+        
+        n = len(Ori_data)
+        if n == 0:
+            return
+        
+        # 上一段最後一筆資料需要的下一筆資料
+        if self.title_wait is not None:
+            self.ws_titles.append(Track_title(Ori_data.time[0]))
+            self.title_wait = None
+            
+        if self.next_wait:
+            self.next_time = Ori_data.time_str(0)
+            self.next_wait = False
+        
+        # 事件種類，只需逐筆檢查追頻起始與終止事件
+        kinds  = Event_kinds(Ori_data)
+        data   = kinds == Track_data
+        events = np.flatnonzero((kinds != Track_other) & (kinds != Track_data))
+        
+        # 時間範圍內的追頻起始點
+        in_range = (Ori_data.time >= self.Start_time) & (Ori_data.time <= self.End_time)
+        
+        # 目前追頻在此段的起始位置 (-1 = 由上一段延續)
+        start = -1 if self.active else None
+        
+        for n1 in events.tolist():
+            kind = kinds[n1]
             
-            # 取得資料時間
-            Timestamp = datetime.strptime(Ori_data[i1][1], "%Y-%m-%d %H:%M:%S.%f")
+            if start is not None:
+                self.extend(Ori_data, data, start, n1)
+                self.close(Ori_data, n1, kind)
+                start = None
             
             # 判斷追頻特徵資料
-            if Ori_data[i1][5] == StartTrack and Timestamp >= Start_time and Timestamp <= End_time:
-                StartTrack_point.append(i1)
-                all_data.append([ ["Timestamp", "FREQ", "IFB", "VFB"] ])
-                
-                # 時間戳記做分頁名稱
-                Timestamp = str(datetime.strptime(Ori_data[i1+1][1], "%Y-%m-%d %H:%M:%S.%f"))
-                Timestamp = Timestamp[0:10] + str("_") + Timestamp[11:13] + str(".") + Timestamp[14:16] + str(".") + Timestamp[17:19]
-                ws_titles.append(f"Track_{Timestamp}")
-        
-        # 分割數據
-        for i2 in StartTrack_point:
-            n1 = i2 + 1
-            
-            while n1 < len(Ori_data):
-                if Ori_data[n1][5] == ModeStatus52:
-                    Timestamp = datetime.strptime(Ori_data[n1][1], "%Y-%m-%d %H:%M:%S.%f")
-                    VFB  = int(Ori_data[n1][6])
-                    IFB  = int(Ori_data[n1][7])
-                    FREQ = int(Ori_data[n1][8])
-                    all_data[StartTrack_point.index(i2)].append([Timestamp, FREQ, IFB, VFB])
-                    
-                elif Ori_data[n1][5] == StopCommand:
-                    break
-                
-                elif Ori_data[n1][5][0:9] == UD7Alarm:
-                    # 錯誤訊息
-                    Error1 = str("驅動器追頻發生錯誤：") + str(Ori_data[n1][1])
-                    print(Error1)
-                    UD7_Error.append(Error1)
-                    break
-                
-                elif Ori_data[n1][5] == StartTrack:
-                    # 尋找資料最後一項
-                    last_One = all_data[StartTrack_point.index(i2)][-1][0]
-
-                    # 尋找資料最後一項的下一項
-                    n2 = 0
-                    for j2 in range(1, len(Ori_data)):
-                        Timestamp = datetime.strptime(Ori_data[j2][1], "%Y-%m-%d %H:%M:%S.%f")
-                        if Timestamp == last_One:
-                            n2 = j2 +1
-                            break
-                    
-                    # 錯誤訊息
-                    Error2 = str("驅動器 or HMI程式未正常關閉：") + str(Ori_data[n2][1])
-                    print(Error2)
-                    UD7_Error.append(Error2)
-                    break
-                
-                elif Ori_data[n1][5] == Mode_changed:
-                    Error3 = "操作模式切換，導致追頻終止：" + str(Ori_data[n1][1])
-                    print(Error3)
-                    UD7_Error.append(Error3)
-                    break
+            if kind == Track_start and in_range[n1]:
+                self.open(Ori_data, n1)
+                start = n1
+        
+        # 追頻延續到下一段
+        if start is not None:
+            self.extend(Ori_data, data, start, n)
+    
+    # 開始追頻 (資料表, 起始位置)
+    def open(self, Ori_data, n1):
+        self.track = [Track_columns(Ori_data, np.zeros(0, dtype = np.int64))]
+        self.next_time = None
+        
+        # 時間戳記做分頁名稱 (下一筆資料)
+        if n1 + 1 < len(Ori_data):
+            self.ws_titles.append(Track_title(Ori_data.time[n1 + 1]))
+        else:
+            self.title_wait = Ori_data.time[n1]
+    
+    # 保留追頻資料 (資料表, 追頻資料位置, 起始位置, 終止位置)
+    def extend(self, Ori_data, data, n0, n1):
+        index = np.flatnonzero(data[n0 + 1:n1]) + n0 + 1
+        if len(index) == 0:
+            return
+        
+        self.track.append(Track_columns(Ori_data, index))
+        
+        # 資料最後一項的下一項
+        if index[-1] + 1 < len(Ori_data):
+            self.next_time = Ori_data.time_str(index[-1] + 1)
+        else:
+            self.next_wait = True
+    
+    # 結束追頻 (資料表, 終止位置, 終止事件)
+    def close(self, Ori_data, n1, kind):
+        self.all_data.append({name: np.concatenate([part[name] for part in self.track]) for name in self.track[0]})
+        self.end_kinds.append(kind)
+        self.track = None
+        
+        if kind == Track_alarm:
+            # 錯誤訊息
+            Error1 = str("驅動器追頻發生錯誤：") + Ori_data.time_str(n1)
+            print(Error1)
+            self.UD7_Error.append(Error1)
+            
+        elif kind == Track_start:
+            # 錯誤訊息 (資料最後一項的下一項)
+            if self.next_time is not None:
+                Error2 = str("驅動器 or HMI程式未正常關閉：") + self.next_time
+            else:
+                Error2 = str("驅動器 or HMI程式未正常關閉：") + str(self.header[1])
+            print(Error2)
+            self.UD7_Error.append(Error2)
+            
+        elif kind == Track_mode:
+            Error3 = "操作模式切換，導致追頻終止：" + Ori_data.time_str(n1)
+            print(Error3)
+            self.UD7_Error.append(Error3)
+    
+    # 資料結束 → 全部資料, 分頁名稱, 錯誤訊息
+    def finish(self):
+        # 資料結束時仍在追頻
+        if self.active:
+            self.close(None, None, None)
+        
+        # 最後一筆為追頻起始點
+        if self.title_wait is not None:
+            self.ws_titles.append(Track_title(self.title_wait))
+            self.title_wait = None
+        
+        return self.all_data, self.ws_titles, self.UD7_Error
+
+# 追頻資料逐列輸出 (追頻資料) → 標題列, 資料列...
+def Track_rows(track, block = 10000):
+    yield list(track)
+
+    # 分段轉換，避免整段追頻一次轉為Python物件
+    names = list(track)
+    for start in range(0, len(track[names[0]]), block):
+        columns = [track[name][start:start + block].tolist() for name in names]
+        for row in zip(*columns):
+            yield list(row)
+
+# 各組追頻資訊 (全部資料, 分頁名稱, 錯誤訊息, 結束事件) → 追頻資訊清單
+def Track_info(all_data, ws_titles, UD7_Error, end_kinds):
+    errors   = iter(UD7_Error)
+    segments = []
+    offset   = 0
+    
+    for i, track in enumerate(all_data):
+        rows = len(track["Timestamp"])
+        kind = end_kinds[i] if i < len(end_kinds) else None
+        
+        segments.append({"segment": i,
+                         "title":   ws_titles[i],
+                         "start":   Time_text(track["Timestamp"][0])  if rows else None,
+                         "end":     Time_text(track["Timestamp"][-1]) if rows else None,
+                         "rows":    rows,
+                         "offset":  offset,
+                         "reason":  Track_end_names[kind],
+                         # 警報 / 未正常關閉 / 模式切換，依序對應一筆錯誤訊息
+                         "error":   next(errors, None) if kind in Track_error_kinds else None})
+        offset += rows
+    
+    return segments
+
+# 重取樣參數：取樣週期毫秒 (環境變數 UD7_RESAMPLE_MS，0 = 不重取樣)、方法 (UD7_RESAMPLE_METHOD)、每段處理的網格點數
+Resample_period  = int(os.environ.get("UD7_RESAMPLE_MS", "0"))
+Resample_method  = os.environ.get("UD7_RESAMPLE_METHOD", "hold")
+Resample_methods = ["hold", "linear", "mean"]
+Resample_chunk   = 1000000
+
+# 單組追頻等間隔重取樣，長追頻分段處理以限制暫存記憶體 (追頻資料, 取樣週期毫秒, 方法, 每段網格點數) → 追頻資料
+# hold：取網格時間前最後一筆數值；linear：前後兩筆線性內插；mean：[網格時間, 網格時間 + 週期) 內的平均，區間內無資料時沿用前值
+def Track_resample(track, period, method = "hold", chunk = None):
+    chunk  = chunk or Resample_chunk
+    names  = [name for name in track if name != "Timestamp"]
+    time   = track["Timestamp"].astype("datetime64[ms]").astype(np.int64)
+    if len(time) == 0:
+        return {name: values[:0] if name == "Timestamp" or method == "hold" else values[:0].astype(np.float64) for name, values in track.items()}
+    
+    total  = int((time[-1] - time[0]) // period) + 1
+    parts  = {name: [] for name in track}
+    
+    for first in range(0, total, chunk):
+        grid = time[0] + np.arange(first, min(first + chunk, total), dtype = np.int64) * period
+        parts["Timestamp"].append(grid.astype("datetime64[ms]"))
+        
+        # 網格時間前最後一筆資料的位置，以及本段網格用到的資料範圍
+        before = np.searchsorted(time, grid, side = "right") - 1
+        span   = slice(before[0], before[-1] + 2)
+        
+        if method == "mean":
+            # 本段網格涵蓋的資料，依所屬網格區間加總
+            low, high = np.searchsorted(time, [grid[0], grid[-1] + period])
+            bins  = (time[low:high] - grid[0]) // period
+            count = np.bincount(bins, minlength = len(grid))
+        
+        for name in names:
+            values = track[name]
+            if method == "hold":
+                parts[name].append(values[before])
+            elif method == "linear":
+                parts[name].append(np.interp(grid, time[span], values[span].astype(np.float64)))
+            else:
+                sums = np.bincount(bins, weights = values[low:high].astype(np.float64), minlength = len(grid))
+                with np.errstate(invalid = "ignore", divide = "ignore"):
+                    parts[name].append(np.where(count > 0, sums / count, values[before]))
+    
+    return {name: np.concatenate(parts[name]) for name in track}
+
+# 全部追頻重取樣 (全部資料, 取樣週期毫秒, 方法) → 全部資料 (週期為0時不處理)
+def Resample_tracks(all_data, period = None, method = None):
+    period = Resample_period if period is None else period
+    method = method or Resample_method
+    if period <= 0:
+        return all_data
+    if method not in Resample_methods:
+        raise ValueError(f"不支援的重取樣方法：{method}")
+    return [Track_resample(track, period, method) for track in all_data]
+
+# 鎖頻分析參數：穩定頻帶 (±Hz)、抖動計算視窗 (筆)、以最後1/4資料的平均頻率作為鎖定頻率
+Lock_tolerance = float(os.environ.get("UD7_LOCK_TOL", "20"))
+Lock_window    = int(os.environ.get("UD7_LOCK_WINDOW", "20"))
+Lock_tail      = 0.25
+
+# 鎖頻分析欄位
+Lock_columns = ["lock_FREQ", "settle_s", "drift_Hz_s", "jitter_Hz", "IFB_overshoot_pct"]
+
+# 區段總和，以累加和計算 [起點, 終點) (數值, 起點陣列, 終點陣列) → 各區段總和
+def Segment_sum(values, starts, ends):
+    total = np.concatenate(([0.0], np.cumsum(values, dtype = np.float64)))
+    return total[ends] - total[starts]
+
+# 各組追頻鎖頻品質，全部追頻合併後一次計算 (全部資料, 穩定頻帶, 抖動視窗) → {欄位: 陣列}
+# lock_FREQ：鎖定頻率；settle_s：追頻開始至頻率不再超出穩定頻帶的時間 (未穩定為空白)
+# drift_Hz_s：穩定後頻率的線性漂移率；jitter_Hz：穩定後滑動視窗標準差的平均
+# IFB_overshoot_pct：IFB最大值超出穩定後平均值的百分比
+def Track_lock(all_data, tolerance = None, window = None):
+    tolerance = Lock_tolerance if tolerance is None else tolerance
+    window    = Lock_window    if window    is None else window
+    
+    lengths = np.array([len(track["Timestamp"]) for track in all_data], dtype = np.int64)
+    full    = lengths > 0
+    lock    = {name: np.full(len(lengths), np.nan) for name in Lock_columns}
+    if not full.any():
+        return lock
+    
+    count  = lengths[full]
+    ends   = np.cumsum(count)
+    starts = ends - count
+    
+    # 時間以各組追頻開始為零點 (秒)，避免累加和的數值誤差
+    time = np.concatenate([track["Timestamp"] for track in all_data]).astype("datetime64[ms]").astype(np.int64)
+    time = (time - np.repeat(time[starts], count)) / 1000
+    FREQ = np.concatenate([track["FREQ"] for track in all_data]).astype(np.float64)
+    IFB  = np.concatenate([track["IFB"]  for track in all_data]).astype(np.float64)
+    
+    # 鎖定頻率
+    tail      = ends - np.maximum(1, (count * Lock_tail).astype(np.int64))
+    lock_FREQ = Segment_sum(FREQ, tail, ends) / (ends - tail)
+    deviation = FREQ - np.repeat(lock_FREQ, count)
+    
+    # 穩定點：最後一筆超出頻帶資料的下一筆，穩定區間為 [穩定點, 終點)
+    index    = np.arange(len(FREQ))
+    last_out = np.maximum.reduceat(np.where(np.abs(deviation) > tolerance, index, -1), starts)
+    settle   = np.maximum(last_out + 1, starts)
+    settled  = settle < ends
+    steady   = np.where(settled, ends - settle, 0)
+    inside   = index >= np.repeat(settle, count)
+    
+    with np.errstate(invalid = "ignore", divide = "ignore"):
+        settle_s = np.where(settled, time[np.minimum(settle, ends - 1)], np.nan)
+        
+        # 漂移率：穩定區間內最小平方法斜率，時間先減去區間平均以避免數值誤差
+        # 穩定資料少於一個視窗時斜率不可靠 (例如只有2筆)，留空白
+        t_mean = Segment_sum(np.where(inside, time, 0), starts, ends) / steady
+        t_dev  = np.where(inside, time - np.repeat(t_mean, count), 0)
+        drift  = Segment_sum(t_dev * deviation, starts, ends) / Segment_sum(t_dev ** 2, starts, ends)
+        drift  = np.where(steady >= max(window, 2), drift, np.nan)
+        
+        # 抖動：穩定區間內每個完整視窗的標準差，再取平均
+        jitter = np.full(len(count), np.nan)
+        if len(FREQ) >= window > 1:
+            values = np.where(inside, deviation, 0)
+            S1 = Segment_sum(values, index[:1 - window or None], index[window - 1:] + 1)
+            S2 = Segment_sum(values ** 2, index[:1 - window or None], index[window - 1:] + 1)
+            std = np.sqrt(np.maximum(S2 - S1 ** 2 / window, 0) / (window - 1))
+            
+            first = index[:len(std)]
+            owner = np.repeat(np.arange(len(count)), count)[:len(std)]
+            valid = (first >= settle[owner]) & (first + window <= ends[owner])
+            total = np.bincount(owner[valid], weights = std[valid], minlength = len(count))
+            windows = np.bincount(owner[valid], minlength = len(count))
+            jitter = np.where(windows > 0, total / windows, np.nan)
+        
+        # IFB過衝
+        IFB_steady = Segment_sum(np.where(inside, IFB, 0), starts, ends) / steady
+        overshoot  = (np.maximum.reduceat(IFB, starts) - IFB_steady) / IFB_steady * 100
+        overshoot  = np.where(settled & (IFB_steady > 0), overshoot, np.nan)
+    
+    for name, values in zip(Lock_columns, [lock_FREQ, settle_s, drift, jitter, overshoot]):
+        lock[name][full] = values
+    return lock
+
+# 異常偵測參數：z分數門檻 (環境變數 UD7_ANOMALY_Z，0 = 停用)、前段視窗筆數 (UD7_ANOMALY_WINDOW)
+Anomaly_z      = float(os.environ.get("UD7_ANOMALY_Z", "0"))
+Anomaly_window = int(os.environ.get("UD7_ANOMALY_WINDOW", "50"))
+
+# 滑動視窗異常偵測：數值與同組追頻前 window 筆的平均值相差超過 threshold 倍標準差即標記，以累加和一次計算
+# (全部資料, z分數門檻, 視窗筆數, 欄位) → 各組追頻異常標記 [{欄位: 布林陣列}], 異常區間 [(追頻編號, 欄位, 起始時間, 結束時間, 最大z分數)]
+def Track_anomalies(all_data, threshold = None, window = None, names = None):
+    threshold = Anomaly_z      if threshold is None else threshold
+    window    = Anomaly_window if window    is None else window
+    names     = list(data_units) if names is None else names
+    
+    marks   = [{} for track in all_data]
+    ranges  = []
+    lengths = np.array([len(track["Timestamp"]) for track in all_data], dtype = np.int64)
+    if threshold <= 0 or window < 2 or lengths.sum() == 0:
+        return marks, ranges
+    
+    ends   = np.cumsum(lengths)
+    starts = ends - lengths
+    owner  = np.repeat(np.arange(len(lengths)), lengths)
+    
+    # 前段資料足夠 window 筆才判斷
+    index = np.arange(ends[-1])
+    index = index[index - starts[owner] >= window]
+    time  = np.concatenate([track["Timestamp"] for track in all_data])
+    
+    for name in names:
+        # 先減去各組平均，避免累加和的數值誤差
+        values = np.concatenate([track[name] for track in all_data]).astype(np.float64)
+        values -= np.repeat(Segment_sum(values, starts, ends) / np.maximum(lengths, 1), lengths)
+        
+        mean = Segment_sum(values, index - window, index) / window
+        std  = np.sqrt(np.maximum(Segment_sum(values ** 2, index - window, index) - window * mean ** 2, 0) / (window - 1))
+        z    = np.abs(values[index] - mean) / np.maximum(std, 1) # 監控數值為整數，標準差至少以1計
+        
+        hit = z > threshold
+        if not hit.any():
+            continue
+        hits, z = index[hit], z[hit]
+        
+        # 同組追頻內間隔不超過視窗的異常點合併為一個區間
+        first = np.flatnonzero(np.concatenate(([True], (np.diff(hits) > window) | (np.diff(owner[hits]) != 0))))
+        last  = np.append(first[1:], len(hits)) - 1
+        peak  = np.maximum.reduceat(z, first)
+        
+        flag = np.zeros(len(values), dtype = bool)
+        flag[hits] = True
+        for i in np.unique(owner[hits]):
+            marks[i][name] = flag[starts[i]:ends[i]]
+        ranges += [(int(owner[hits[a]]), name, time[hits[a]], time[hits[b]], float(p)) for a, b, p in zip(first, last, peak)]
+    
+    ranges.sort(key = lambda item: (item[2], names.index(item[1])))
+    return marks, ranges
+
+# 異常區間錯誤訊息 (異常區間) → 錯誤訊息清單
+def Anomaly_text(ranges):
+    return [f"{name} 數值異常 (z = {peak:.1f})：{Time_text(start)} ~ {Time_text(end)}" for i, name, start, end, peak in ranges]
+
+# 追頻統計表欄位
+Stats_columns = ["segment", "title", "start", "end", "duration_s", "samples", 
+                 "FREQ_mean", "FREQ_min", "FREQ_max", "FREQ_std", "IFB_max", "VFB_mean"] + Lock_columns + ["reason", "error"]
+
+# 各組追頻統計與鎖頻分析，全部追頻合併後以 reduceat 一次計算 (全部資料, 分頁名稱, 錯誤訊息, 結束事件) → 統計表 {欄位: 陣列}
+def Track_stats(all_data, ws_titles, UD7_Error, end_kinds):
+    info    = Track_info(all_data, ws_titles, UD7_Error, end_kinds)
+    lengths = np.array([len(track["Timestamp"]) for track in all_data], dtype = np.int64)
+    full    = lengths > 0
+    count   = lengths[full]
+    starts  = (np.cumsum(lengths) - lengths)[full]
+    
+    # 合併欄位 (空的追頻不佔位置)
+    def column(name, dtype):
+        if len(all_data) == 0:
+            return np.zeros(0, dtype = dtype)
+        return np.concatenate([track[name] for track in all_data]).astype(dtype)
+    
+    # 只有資料的追頻有統計值，其餘為 NaN
+    def per_track(values):
+        out = np.full(len(lengths), np.nan)
+        out[full] = values
+        return out
+    
+    stats = {"segment": np.arange(len(all_data)),
+             "title":   list(ws_titles[:len(all_data)]),
+             "start":   [segment["start"] for segment in info],
+             "end":     [segment["end"]   for segment in info],
+             "samples": lengths}
+    
+    if len(starts) > 0:
+        time = column("Timestamp", "datetime64[ms]").astype(np.int64)
+        FREQ = column("FREQ", np.float64)
+        IFB  = column("IFB",  np.float64)
+        VFB  = column("VFB",  np.float64)
+        
+        FREQ_mean = np.add.reduceat(FREQ, starts) / count
+        deviation = FREQ - np.repeat(FREQ_mean, count)
+        with np.errstate(invalid = "ignore", divide = "ignore"):
+            FREQ_std = np.sqrt(np.add.reduceat(deviation ** 2, starts) / (count - 1)) # 樣本標準差 (同Excel STDEV)
+        
+        stats["duration_s"] = per_track((time[starts + count - 1] - time[starts]) / 1000)
+        stats["FREQ_mean"]  = per_track(FREQ_mean)
+        stats["FREQ_min"]   = per_track(np.minimum.reduceat(FREQ, starts))
+        stats["FREQ_max"]   = per_track(np.maximum.reduceat(FREQ, starts))
+        stats["FREQ_std"]   = per_track(np.where(count > 1, FREQ_std, np.nan))
+        stats["IFB_max"]    = per_track(np.maximum.reduceat(IFB, starts))
+        stats["VFB_mean"]   = per_track(np.add.reduceat(VFB, starts) / count)
+    else:
+        for name in ["duration_s", "FREQ_mean", "FREQ_min", "FREQ_max", "FREQ_std", "IFB_max", "VFB_mean"]:
+            stats[name] = per_track(None)
+    
+    stats.update(Track_lock(all_data))
+    stats["reason"] = [segment["reason"] for segment in info]
+    stats["error"]  = [segment["error"]  for segment in info]
+    return {name: stats[name] for name in Stats_columns}
+
+# 統計表逐列輸出，數值取小數3位，無資料為空白 (統計表) → 標題列, 資料列...
+def Stats_rows(stats):
+    yield list(Stats_columns)
+    
+    columns = []
+    for name in Stats_columns:
+        values = stats[name]
+        if isinstance(values, np.ndarray) and values.dtype.kind == "f":
+            values = [None if np.isnan(value) else round(value, 3) for value in values.tolist()]
+        elif isinstance(values, np.ndarray):
+            values = values.tolist()
+        columns.append(values)
+    
+    for row in zip(*columns):
+        yield list(row)
+
+# 統計表存為CSV (統計表, 檔案路徑) → 檔案路徑
+def Stats_csv(stats, save_path):
+    with open(save_path, "w", newline = "", encoding = "utf-8-sig") as file:
+        csv.writer(file).writerows(Stats_rows(stats))
+    return save_path
+
+# 記憶體內結果快取，超過容量上限時淘汰最久未使用的結果 (容量上限)
+class Result_Cache:
+    def __init__(self, limit):
+        self.limit = limit
+        self.items = OrderedDict() # {索引: (結果, 大小)}
+        self.size  = 0
+    
+    # 取得結果 (索引) → 結果 / None
+    def get(self, key):
+        if key not in self.items:
+            return None
+        self.items.move_to_end(key)
+        return self.items[key][0]
+    
+    # 儲存結果 (索引, 結果, 大小)
+    def put(self, key, value, size):
+        if key in self.items:
+            self.size -= self.items.pop(key)[1]
+        if size > self.limit:
+            return
+        
+        self.items[key] = (value, size)
+        self.size += size
+        while self.size > self.limit:
+            self.size -= self.items.popitem(last = False)[1][1]
+    
+    # 清除全部結果
+    def clear(self):
+        self.items.clear()
+        self.size = 0
+
+# 預覽/執行共用的切分結果快取
+Session_cache = Result_Cache(int(os.environ.get("UD7_SESSION_MB", "512")) * 1024 * 1024)
+
+# 資料夾內UD7監控資料CSV檔案指紋 (路徑) → ((檔名, 大小, 修改時間), ...)
+def Folder_fingerprint(f_path):
+    fingerprint = []
+    for f in os.listdir(f_path):
+        if f.endswith(".csv") or f.endswith(".CSV"):
+            # 只計入UD7監控資料，略過輸出的統計表等CSV (否則每次輸出都會改變指紋)
+            path = os.path.join(f_path, f)
+            if CSV_Extent(path) is None:
+                continue
+            stat = os.stat(path)
+            fingerprint.append((f, stat.st_size, stat.st_mtime_ns))
+    return tuple(fingerprint)
+
+# 切分結果佔用記憶體 (全部資料, 分頁名稱, 錯誤訊息) → 位元組
+def Result_size(all_data, ws_titles, UD7_Error):
+    size = sum(column.nbytes + 100 for track in all_data for column in track.values())
+    size += sum(len(text) * 4 + 50 for text in ws_titles + UD7_Error)
+    return size
+
+# UD7_HMI資料處理 (路徑, 起始時間, 終止時間, 行程數, 背景工作, 發生錯誤時拋出, 另外回傳結束事件)
+def UD7_HMI(f_path, Start_time, End_time, workers = None, task = None, strict = False, ends = False):
+    # 相同資料夾內容與時間範圍，直接使用上次結果
+    try:
+        key = (os.path.abspath(f_path), Folder_fingerprint(f_path), Start_time, End_time)
+    except OSError:
+        key = None
+    
+    result = Session_cache.get(key) if key is not None else None
+    if result is not None:
+        all_data, ws_titles, UD7_Error, end_kinds = result
+        if ends:
+            return list(all_data), list(ws_titles), list(UD7_Error), list(end_kinds)
+        return list(all_data), list(ws_titles), list(UD7_Error)
+    
+    # 單次掃描切分器，只保留追頻中的資料
+    segmenter  = Track_Segmenter(Start_time, End_time)
+    complete   = False
+    prefetcher = None
+    
+    try:
+        # 每次轉換只計數一次 (命令列模式的資料夾探測會先建立一次索引)
+        with Profile_stage("CSV_Index"):
+            index = CSV_Index(f_path)
+        Profile_count("csv_files", len(index))
+        
+        # 與搜尋時間重疊的檔案，以多行程預先解析
+        overlap = [extent for extent in index
+                   if not (extent["last"] < segmenter.Start_time or extent["first"] > segmenter.End_time)]
+        prefetcher = CSV_Prefetcher(overlap, [Start_time if extent["first"] < segmenter.Start_time else None for extent in overlap], workers)
+        
+        # 依檔案時間範圍，略過搜尋時間外的檔案
+        for n, extent in enumerate(index):
+            if task is not None:
+                task.update(f"解析檔案，已找到 {len(segmenter.all_data)} 組追頻", n, len(index))
+            
+            seek_time = None
+            
+            if not segmenter.active:
+                if extent["last"] < segmenter.Start_time or extent["first"] > segmenter.End_time:
+                    continue
                 
-                n1 += 1
-                    
+                # 起始時間落在檔案中間
+                if extent["first"] < segmenter.Start_time:
+                    seek_time = Start_time
+            
+            # 逐段讀取資料並切分數據 (CSV_read 含等待子行程解析的時間)
+            for Ori_data in Profile_iter("CSV_read", prefetcher.tables(extent, seek_time)):
+                if task is not None:
+                    task.check()
+                Profile_count("csv_rows", len(Ori_data))
+                with Profile_stage("Segment"):
+                    segmenter.feed(Ori_data)
+        
+        complete = True
+
+    except Task_Cancelled:
+        raise
+
     except Exception as e:
+        if strict:
+            raise
         print("合併資料時，發生錯誤：", e)
     
+    finally:
+        if prefetcher is not None:
+            prefetcher.close()
+
+    all_data, ws_titles, UD7_Error = segmenter.finish()
+    end_kinds = segmenter.end_kinds
+    Profile_count("tracks", len(all_data))
+    
+    # 只保留完整的結果
+    if complete and key is not None:
+        Session_cache.put(key, (list(all_data), list(ws_titles), list(UD7_Error), list(end_kinds)), Result_size(all_data, ws_titles, UD7_Error))
+    
+    if ends:
+        return all_data, ws_titles, UD7_Error, end_kinds
     return all_data, ws_titles, UD7_Error
 
 # 繪圖模組-----------------------------------------------------------------------------------------
 
+# 圖表降採樣點數上限 (環境變數 UD7_CHART_POINTS，0 = 不降採樣)，資料仍完整寫入工作表
+Chart_points = int(os.environ.get("UD7_CHART_POINTS", "4000"))
+
+# 降採樣資料起始欄 (AA欄起，隱藏)
+Chart_column = 27
+
+# 異常標記起始欄 (AE欄起，隱藏)
+Mark_column = 31
+
+# 圖表降採樣：每區間保留各欄位最大值與最小值的位置，保留峰值與頻率下降 (追頻資料, 點數上限) → 資料位置 / None
+def Chart_index(DATA, points):
+    header = list(DATA)
+    n = len(DATA[header[0]])
+    if points <= 0 or n <= points or len(header) < 2:
+        return None
+    
+    # 每區間每欄保留2點
+    buckets = max(1, (points - 2) // (2 * (len(header) - 1)))
+    size    = -(-n // buckets)
+    offsets = np.arange(buckets, dtype = np.int64)[:, None] * size
+    
+    index = [np.array([0, n - 1], dtype = np.int64)]
+    for name in header[1:]:
+        # 補齊最後一個區間 (以最後一筆數值補齊，位置超出時取最後一筆)
+        values = np.pad(DATA[name], (0, buckets * size - n), mode = "edge").reshape(buckets, size)
+        index.append(np.minimum(values.argmin(axis = 1) + offsets[:, 0], n - 1))
+        index.append(np.minimum(values.argmax(axis = 1) + offsets[:, 0], n - 1))
+    
+    return np.unique(np.concatenate(index))
+
+# 資料列加上降採樣資料與異常標記 (資料列, 追頻資料, 資料位置, 異常標記) → 資料列
+def Chart_rows(rows, DATA, index, marks = None):
+    header = list(DATA)
+    blocks = []
+    
+    if index is not None:
+        columns = [DATA[name][index].tolist() for name in header]
+        blocks.append((Chart_column, [header] + [list(row) for row in zip(*columns)]))
+    
+    # 異常標記：與圖表資料同列，只保留異常點數值
+    if marks:
+        position = index if index is not None else slice(None)
+        columns  = [[value if flag else None for value, flag in zip(DATA[name][position].tolist(), marks[name][position].tolist())] for name in marks]
+        blocks.append((Mark_column, [[f"{name} 異常" for name in marks]] + [list(row) for row in zip(*columns)]))
+    
+    for n, row in enumerate(rows):
+        for column, helpers in blocks:
+            if n < len(helpers):
+                row = row + [None] * (column - 1 - len(row)) + helpers[n]
+        yield row
+
 # 設定圖表標題格式
 def set_chart_title_size(chart, size = 1400):
     paraprops = ParagraphProperties()
@@ -195,18 +1411,22 @@ def Drawing_adress(n):
         adress.append(chr(remainder + ord('A')))
     return ''.join(reversed(adress))
 
-# Excel 圖表繪製 (資料/線顏色/線型/工作分頁)
-def Drawing(DATA, colors, linetype, ws):
+# Excel 圖表繪製 (資料/線顏色/線型/工作分頁/降採樣資料位置/異常標記)
+def Drawing(DATA, colors, linetype, ws, index = None, marks = None):
+    # 資料標題與列數 (含標題列)
+    header = list(DATA)
+    rows   = len(DATA[header[0]]) + 1
+
     # XY散佈圖
     chart = LineChart()
     chart.title = "Track-Test"
     set_chart_title_size(chart, size = 1400)
     chart.style = 13
     
-    if len(DATA[0]) == 2:
+    if len(header) == 2:
         R = [[2, 3]]
     
-    elif len(DATA[0]) >= 3:
+    elif len(header) >= 3:
         # 右Y軸
         chart2 = LineChart()
         chart2.y_axis.axId = 200
@@ -214,49 +1434,53 @@ def Drawing(DATA, colors, linetype, ws):
         chart2.y_axis.majorGridlines = None  # 取消格線
         chart2.y_axis.majorTickMark  = 'out' # 刻度在外
         
-        if len(DATA[0]) == 3:
+        if len(header) == 3:
             R = [[2, 3], [3, 4]]
-            chart2.y_axis.title = data_units[DATA[0][2]]
+            chart2.y_axis.title = data_units[header[2]]
             
-        elif len(DATA[0]) == 4:
+        elif len(header) == 4:
             R = [[2, 3], [3, 5]]
-            chart2.y_axis.title = str(data_units[DATA[0][2]] + "\n" + data_units[DATA[0][3]])
+            chart2.y_axis.title = str(data_units[header[2]] + "\n" + data_units[header[3]])
     
     # 建立數據對應顏色標籤
     data_colors = []
-    for i1 in range(1, len(DATA[0])):
-        if DATA[0][i1] == "FREQ":
+    for i1 in range(1, len(header)):
+        if header[i1] == "FREQ":
             data_colors.append(colors[0])
 
-        elif DATA[0][i1] == "IFB":
+        elif header[i1] == "IFB":
             data_colors.append(colors[1])
 
-        elif DATA[0][i1] == "VFB":
+        elif header[i1] == "VFB":
             data_colors.append(colors[2])
        
     # 調整Y軸上下限
-    for i in range(1, len(DATA[0])):
+    for i in range(1, len(header)):
         # 取得數據
-        values = [int(row[i]) for row in DATA[1:]]
-        if len(DATA) > 5:
-            del values[2], values[1], values[0] # 忽略前3點數據
+        values = DATA[header[i]]
+        if rows > 5:
+            values = values[3:] # 忽略前3點數據
+        
+        # 追頻無數據時，使用預設上下限
+        if len(values) == 0:
+            continue
         
         # 取得數據基準
-        scale = data_scale[DATA[0][i]]
+        scale = data_scale[header[i]]
         y_Base = lambda y: ((y // scale) + 1) * scale if (y % scale) > 0 else y
         
         # 取得數據Y軸上下限
-        if DATA[0][i] == "FREQ":
-            avg = y_Base(int(sum(values) / len(values)))
+        if header[i] == "FREQ":
+            avg = y_Base(int(values.mean(dtype = np.float64))) # 以float64累加，避免int16/int32加總溢位
             min_scale = avg - scale * 2
             max_scale = avg + scale
             chart.y_axis.majorUnit = scale / 2 # 設定格線
 
-        elif DATA[0][i] == "IFB":
-            min_scale = y_Base(min(values)) - scale
-            max_scale = y_Base(max(values)) + scale
+        elif header[i] == "IFB":
+            min_scale = y_Base(int(values.min())) - scale
+            max_scale = y_Base(int(values.max())) + scale
         
-        elif DATA[0][i] == "VFB":
+        elif header[i] == "VFB":
             min_scale = 0
             max_scale = 120
         
@@ -269,22 +1493,30 @@ def Drawing(DATA, colors, linetype, ws):
             chart2.y_axis.scaling.min = min_scale
             chart2.y_axis.scaling.max = max_scale
             
-        elif i == 3 and DATA[0][i] == "VFB":
+        elif i == 3 and header[i] == "VFB":
             chart2.y_axis.scaling.min = 0
 
+    # 圖表資料來源：完整資料，或隱藏欄位中的降採樣資料
+    column = 0
+    if index is not None:
+        column = Chart_column - 1
+        rows   = len(index) + 1
+    if index is not None or marks:
+        chart.visible_cells_only = False # 隱藏欄位仍需繪製
+
     # X軸
     chart.x_axis.title = "Time"
     chart.x_axis.number_format = "h:mm:ss.000"
-    x_values = Reference(ws, min_col = 1, max_col = 1, min_row = 2, max_row = len(DATA))
+    x_values = Reference(ws, min_col = 1 + column, max_col = 1 + column, min_row = 2, max_row = rows)
 
     # 左Y軸
-    chart.y_axis.title = data_units[DATA[0][1]]
+    chart.y_axis.title = data_units[header[1]]
     chart.y_axis.majorGridlines = openpyxl.chart.axis.ChartLines() # 打開格線
     
     # 左右Y軸資料合併
     for i2 in range(len(R)):
         for y in range(R[i2][0], R[i2][1]):
-            y_values = Reference(ws, min_col = y, min_row = 1, max_row = len(DATA))
+            y_values = Reference(ws, min_col = y + column, min_row = 1, max_row = rows)
             series = Series(y_values, title_from_data = True)
             line_properties = LineProperties(w = 12700, solidFill = data_colors[y - 2], prstDash = linetype[0])
             series.graphicalProperties.line = line_properties
@@ -294,15 +1526,29 @@ def Drawing(DATA, colors, linetype, ws):
                 
             elif i2 == 1:
                 chart2.append(series)
+    
+    # 異常標記：只顯示紅色資料點，畫在該欄位的Y軸
+    for k, name in enumerate(marks or []):
+        y_values = Reference(ws, min_col = Mark_column + k, min_row = 1, max_row = rows)
+        series = Series(y_values, title_from_data = True)
+        series.marker.symbol = "x"
+        series.marker.size   = 7
+        series.marker.graphicalProperties = GraphicalProperties(solidFill = "FF0000", ln = LineProperties(solidFill = "FF0000"))
+        series.graphicalProperties.line.noFill = True
+        
+        if name == header[1]:
+            chart.append(series)
+        else:
+            chart2.append(series)
         
     # 設定X軸標籤
     chart.set_categories(x_values)
                 
-    if len(DATA[0]) >= 3:
+    if len(header) >= 3:
         chart += chart2
     
     # 圖表儲存位置
-    adress = Drawing_adress(len(DATA[0])) + str("1") 
+    adress = Drawing_adress(len(header)) + str("1") 
     
     chart.height = 15 # 設置高度
     chart.width  = 17 # 設置寬度
@@ -311,47 +1557,489 @@ def Drawing(DATA, colors, linetype, ws):
 
 # Excel模組----------------------------------------------------------------------------------------
 
-# Excel工作簿建立 (資料/分頁名稱/線顏色/線型)
-def Excel_file(DATA, ws_titles, colors, linetypes):
+# 統計分頁，追頻名稱超連結至對應分頁 (工作表, 統計表, {追頻編號: 實際分頁名稱})
+def Summary_sheet(ws, stats, sheets = None):
+    widths = {"segment": 9, "title": 28, "start": 24, "end": 24, "samples": 9, "reason": 12, "error": 50}
+    for n, name in enumerate(Stats_columns):
+        ws.column_dimensions[get_column_letter(n + 1)].width = widths.get(name, 11)
+    
+    for n, row in enumerate(Stats_rows(stats)):
+        if n > 0 and sheets and n - 1 in sheets:
+            cell = WriteOnlyCell(ws, value = row[1])
+            cell.hyperlink = Hyperlink(ref = "", location = f"'{sheets[n - 1]}'!A1")
+            cell.style = "Hyperlink"
+            row[1] = cell
+        ws.append(row)
+        
+        # 一般模式下超連結位置於加入列後才確定
+        if isinstance(row[1], Cell):
+            row[1].hyperlink.ref = row[1].coordinate
+
+# Excel工作簿建立 (資料/分頁名稱/線顏色/線型/背景工作/逐列寫入/圖表點數上限/統計表/異常標記/各分頁的追頻編號)
+# write_only：資料逐列寫入暫存檔，記憶體用量不隨資料量增加，但工作簿只能儲存一次
+def Excel_file(DATA, ws_titles, colors, linetypes, task = None, write_only = True, chart_points = None, summary = None, marks = None, sources = None):
+    chart_points = Chart_points if chart_points is None else chart_points
     
     # 創建一個新的 Excel 工作簿
-    wb = Workbook()  
+    wb = Workbook(write_only = write_only)
+    
+    # 統計分頁放在第一頁 (逐列寫入時需先建立)
+    summary_ws = wb.create_sheet("Summary") if summary is not None and write_only else None
+    sheets = {}
 
     for i1 in range(len(DATA)):
+        if task is not None:
+            task.update("建立工作表", i1, len(DATA))
+        
         # 新增Excel分頁
-        if i1 == 0:
+        if i1 == 0 and not write_only:
             ws = wb.active
             ws.title = ws_titles[i1]
-            
-            for row in DATA[i1]:
-                ws.append(row)
-                
         else:
             ws = wb.create_sheet(title = ws_titles[i1])
-            
-            for row in DATA[i1]:
+        sheets.setdefault(sources[i1] if sources is not None else i1, ws.title) # 超過列數上限的追頻連結到第一個分頁
+        
+        # 資料點過多時，圖表改用隱藏欄位中的降採樣資料 (需在寫入資料前設定欄寬)
+        rows  = Track_rows(DATA[i1])
+        index = Chart_index(DATA[i1], chart_points)
+        if index is not None:
+            for k in range(len(DATA[i1])):
+                ws.column_dimensions[get_column_letter(Chart_column + k)].hidden = True
+        
+        # 異常標記 (只標記有輸出的欄位)，降採樣時保留異常點
+        mark = {name: flag for name, flag in marks[i1].items() if name in DATA[i1]} if marks else {}
+        if mark:
+            for k in range(len(mark)):
+                ws.column_dimensions[get_column_letter(Mark_column + k)].hidden = True
+            if index is not None:
+                index = np.union1d(index, np.flatnonzero(np.logical_or.reduce(list(mark.values()))))
+        
+        if index is not None or mark:
+            rows = Chart_rows(rows, DATA[i1], index, mark)
+        
+        with Profile_stage("Sheet_rows"):
+            for row in rows:
                 ws.append(row)
+        Profile_count("sheets")
+        Profile_count("sheet_rows", len(DATA[i1]["Timestamp"]))
                 
         # 執行圖表繪製
-        chart, adress = Drawing(DATA[i1], colors, linetypes, ws)
+        with Profile_stage("Drawing"):
+            chart, adress = Drawing(DATA[i1], colors, linetypes, ws, index, mark)
         ws.add_chart(chart, adress)
         
+        # 完成分頁寫入，釋放寫入緩衝
+        if write_only:
+            ws.close()
+    
+    # 統計分頁 (依追頻編號連結實際分頁，分頁名稱重複時已被重新命名)
+    if summary is not None:
+        if summary_ws is None:
+            summary_ws = wb.create_sheet("Summary", 0)
+            wb.active = 0
+        Summary_sheet(summary_ws, summary, sheets)
+        if write_only:
+            summary_ws.close()
+    
+    # 逐列寫入的工作簿至少需要一個工作表
+    if write_only and len(wb.sheetnames) == 0:
+        wb.create_sheet()
+        
     return wb
 
-# 檢查Excel是否成功生成 (工作簿/路徑)
-def Save_Excel_file(wb, f_path):
-    try:
-        # 儲存檔案
-        save_path = f'{f_path}/UD7_HMI_Output.xlsx'
+# 預設Excel檔案路徑 (路徑)
+def Excel_save_path(f_path):
+    return f'{f_path}/UD7_HMI_Output.xlsx'
+
+# 儲存Excel檔案 (工作簿/路徑/檔案路徑) → 檔案路徑
+def Excel_save(wb, f_path, save_path = None):
+    if save_path is None:
+        save_path = Excel_save_path(f_path)
+    with Profile_stage("Excel_save"):
         wb.save(save_path)
-        
+    Profile_count("xlsx_bytes", os.path.getsize(save_path))
+    return save_path
+
+# 顯示Excel儲存結果 (錯誤)
+def Save_Excel_message(error = None):
+    if error is None:
         # 成功訊息
         messagebox.showinfo("成功", "成功合併檔案：UD7_HMI_Output.xlsx")
-         
-    except Exception as e:
-        print("⚠️檢查 1：讀確認UD7_HMI_Output.xlsx，檔案是否有開啟！")
-        messagebox.showerror("錯誤", f"儲存檔案時，發生錯誤：\n{str(e)}\n\n>>>讀確認UD7_HMI_Output.xlsx，檔案是否有開啟！<<<")
         
+    else:
+        log.warning("⚠️檢查 1：讀確認UD7_HMI_Output.xlsx，檔案是否有開啟！(%s)", error)
+        messagebox.showerror("錯誤", f"儲存檔案時，發生錯誤：\n{str(error)}\n\n>>>讀確認UD7_HMI_Output.xlsx，檔案是否有開啟！<<<")
+
+# Excel單一工作表列數上限
+Excel_max_rows = 1048576
+
+# 超過列數上限的追頻分成多個分頁 (全部資料, 分頁名稱, 異常標記) → 全部資料, 分頁名稱, 原追頻編號, 異常標記
+def Excel_split(all_data, ws_titles, marks = None):
+    limit = Excel_max_rows - 1 # 標題列
+    tracks, titles, sources, parts = [], [], [], []
+    
+    for i, track in enumerate(all_data):
+        n    = len(track["Timestamp"])
+        mark = marks[i] if marks else {}
+        if n <= limit:
+            tracks.append(track)
+            titles.append(ws_titles[i])
+            sources.append(i)
+            parts.append(mark)
+            continue
+        
+        for k, start in enumerate(range(0, n, limit)):
+            tracks.append({name: track[name][start:start + limit] for name in track})
+            titles.append(ws_titles[i] if k == 0 else f"{ws_titles[i]}_{k + 1}")
+            sources.append(i)
+            parts.append({name: flag[start:start + limit] for name, flag in mark.items()})
+    
+    return tracks, titles, sources, parts
+
+# 分檔方式與預設數量 (day：依日期；segments：每檔追頻組數；rows：每檔資料列數)
+Shard_policies = {"day": None, "segments": 200, "rows": 1000000}
+
+# 規劃分檔 (全部資料, 分頁名稱, 分檔方式, 數量) → [(分檔名稱, 追頻編號清單)]
+def Shard_plan(all_data, ws_titles, policy, size = None):
+    size   = size or Shard_policies[policy]
+    groups = []
+    rows   = 0
+    
+    for i, track in enumerate(all_data):
+        n = len(track["Timestamp"]) + 1
+        
+        if policy == "day":
+            # 分頁名稱 Track_YYYY-MM-DD_hh.mm.ss
+            new = not groups or groups[-1][0] != ws_titles[i][6:16]
+        elif policy == "segments":
+            new = not groups or len(groups[-1][1]) >= size
+        else:
+            new = not groups or rows + n > size
+        
+        if new:
+            groups.append((ws_titles[i][6:16] if policy == "day" else None, []))
+            rows = 0
+        groups[-1][1].append(i)
+        rows += n
+    
+    # 依序編號
+    return [(name or f"{k + 1:03d}", index) for k, (name, index) in enumerate(groups)]
+
+# 子行程：寫入單一分檔 (追頻資料, 分頁名稱, 檔案路徑, 異常標記) → 檔案路徑, 實際分頁名稱
+def Shard_write(tracks, titles, save_path, marks = None):
+    wb = Excel_file(tracks, titles, colors, linetypes, marks = marks)
+    sheetnames = wb.sheetnames
+    wb.save(save_path)
+    return save_path, sheetnames
+
+# 分檔輸出Excel，並建立含超連結的索引工作簿 (全部資料, 分頁名稱, 錯誤訊息, 結束事件, 索引檔路徑, 分檔方式, 數量, 行程數, 背景工作, 統計表, 異常標記) → 分檔路徑清單
+def Excel_shards(all_data, ws_titles, UD7_Error, end_kinds, save_path, policy = "segments", size = None, workers = None, task = None, summary = None, marks = None):
+    info = Track_info(all_data, ws_titles, UD7_Error, end_kinds)
+    tracks, titles, sources, parts = Excel_split(all_data, ws_titles, marks)
+    groups = Shard_plan(tracks, titles, policy, size)
+    
+    base, ext = os.path.splitext(save_path)
+    jobs = [(f"{base}_{name}{ext}", index) for name, index in groups]
+    
+    workers = workers if workers is not None else Workers
+    workers = workers if workers > 0 else (os.cpu_count() or 1)
+    
+    # 多行程同時寫入分檔
+    results = {}
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers = min(workers, len(jobs))) as executor:
+            futures = [executor.submit(Shard_write, [tracks[i] for i in index], [titles[i] for i in index], path, [parts[i] for i in index]) for path, index in jobs]
+            for n, future in enumerate(as_completed(futures)):
+                if task is not None:
+                    task.update("寫入分檔", n, len(jobs))
+                path, sheetnames = future.result()
+                results[path] = sheetnames
+    else:
+        for n, (path, index) in enumerate(jobs):
+            if task is not None:
+                task.update("寫入分檔", n, len(jobs))
+            path, sheetnames = Shard_write([tracks[i] for i in index], [titles[i] for i in index], path, [parts[i] for i in index])
+            results[path] = sheetnames
+    
+    # 索引工作簿
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Index"
+    ws.append(["Shard", "Sheet", "Segment", "Start", "End", "Rows", "Reason", "Error"])
+    
+    for path, index in jobs:
+        file_name = os.path.basename(path)
+        for i, sheet in zip(index, results[path]):
+            segment = info[sources[i]]
+            ws.append([file_name, sheet, segment["segment"], segment["start"], segment["end"], 
+                       len(tracks[i]["Timestamp"]), segment["reason"], segment["error"]])
+            
+            # 超連結至分檔 / 分檔內的分頁
+            ws.cell(row = ws.max_row, column = 1).hyperlink = file_name
+            ws.cell(row = ws.max_row, column = 2).hyperlink = Hyperlink(ref = f"B{ws.max_row}", target = file_name, location = f"'{sheet}'!A1")
+            ws.cell(row = ws.max_row, column = 1).style = "Hyperlink"
+            ws.cell(row = ws.max_row, column = 2).style = "Hyperlink"
+    
+    for column, width in zip("ABCDEFGH", [28, 28, 9, 24, 24, 9, 12, 50]):
+        ws.column_dimensions[column].width = width
+    ws.freeze_panes = "A2"
+    
+    if summary is not None:
+        Summary_sheet(wb.create_sheet("Summary"), summary)
+    
+    wb.save(save_path)
+    
+    # 刪除上次輸出、本次已不存在的分檔
+    paths = [path for path, index in jobs]
+    for name in os.listdir(os.path.dirname(os.path.abspath(save_path))):
+        path = os.path.join(os.path.dirname(save_path), name)
+        if re.fullmatch(re.escape(os.path.basename(base)) + r"_(\d{3}|\d{4}-\d{2}-\d{2})" + re.escape(ext), name) and path not in paths:
+            os.remove(path)
+    
+    return paths
+
+# 欄式輸出模組--------------------------------------------------------------------------------------
+
+# 欄式檔案格式與副檔名 (parquet：壓縮；feather：不壓縮，可記憶體映射零複製讀取)
+Columnar_formats = {"parquet": ".parquet", "feather": ".feather"}
+
+# 載入pyarrow (選用套件) → pyarrow
+def Load_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.feather
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("欄式輸出需要 pyarrow 套件：pip install pyarrow")
+    return pyarrow
+
+# 追頻資料轉為Arrow表格 (pyarrow, 追頻資料清單, 追頻編號清單, 欄位) → 表格
+# 資料欄位固定為int32 (重取樣 linear / mean 為float64)，不隨各次數值範圍壓縮的型別改變，檔案間結構一致
+def Columnar_table(pa, tracks, ids, names):
+    lengths = [len(track["Timestamp"]) for track in tracks]
+    columns = {"segment": np.repeat(np.asarray(ids, dtype = np.int32), lengths),
+               "Timestamp": np.concatenate([track["Timestamp"] for track in tracks]).astype("datetime64[ms]")}
+    
+    for name in names:
+        values = np.concatenate([track[name] for track in tracks])
+        columns[name] = values.astype(np.float64 if values.dtype.kind == "f" else np.int32)
+    
+    return pa.table(columns)
+
+# 寫入欄式檔案，先寫暫存檔再取代 (pyarrow, 表格, 中繼資料, 檔案路徑, 格式)
+def Columnar_write(pa, table, metadata, save_path, fmt):
+    table = table.replace_schema_metadata({"UD7_HMI": json.dumps(metadata, ensure_ascii = False)})
+    
+    tmp_path = save_path + ".tmp"
+    if fmt == "parquet":
+        pa.parquet.write_table(table, tmp_path, compression = "zstd")
+    else:
+        pa.feather.write_feather(table, tmp_path, compression = "uncompressed")
+    os.replace(tmp_path, save_path)
+
+# 輸出欄式檔案 (全部資料, 分頁名稱, 錯誤訊息, 結束事件, 檔案路徑, 格式, 欄位, 每組追頻一個檔案) → 檔案路徑清單
+def Columnar_file(all_data, ws_titles, UD7_Error, end_kinds, save_path, fmt = "parquet", names = None, per_segment = False):
+    pa = Load_pyarrow()
+    names    = list(data_units) if names is None else names
+    segments = Track_info(all_data, ws_titles, UD7_Error, end_kinds)
+    
+    # 單一檔案：全部追頻依序合併，以segment欄位區分
+    if not per_segment:
+        table = Columnar_table(pa, all_data, range(len(all_data)), names)
+        Columnar_write(pa, table, {"segments": segments, "errors": UD7_Error}, save_path, fmt)
+        return [save_path]
+    
+    # 每組追頻一個檔案 (資料夾)
+    os.makedirs(save_path, exist_ok = True)
+    paths = []
+    for i, track in enumerate(all_data):
+        path = os.path.join(save_path, f"{i:05d}_{ws_titles[i]}{Columnar_formats[fmt]}")
+        Columnar_write(pa, Columnar_table(pa, [track], [i], names), {"segments": [segments[i]]}, path, fmt)
+        paths.append(path)
+    return paths
+
+# 讀取欄式檔案，feather以記憶體映射讀取 (檔案路徑) → 表格, 追頻資訊
+def Columnar_load(save_path):
+    pa = Load_pyarrow()
+    if save_path.endswith(Columnar_formats["feather"]):
+        table = pa.feather.read_table(save_path, memory_map = True)
+    else:
+        table = pa.parquet.read_table(save_path, memory_map = True)
+    
+    metadata = table.schema.metadata or {}
+    info = json.loads(metadata.get(b"UD7_HMI", b"{}"))
+    return table, info
+
+# 統計表CSV路徑 (輸出路徑)
+def Summary_path(save_path):
+    base = save_path if os.path.isdir(save_path) else os.path.splitext(save_path)[0]
+    return base + "_Summary.csv"
+
+# 預設輸出路徑 (路徑, 格式, 每組追頻一個檔案)
+def Output_path(f_path, fmt = "xlsx", per_segment = False):
+    if fmt == "xlsx":
+        return Excel_save_path(f_path)
+    if per_segment:
+        return f'{f_path}/UD7_HMI_Output_{fmt}'
+    return f'{f_path}/UD7_HMI_Output{Columnar_formats[fmt]}'
+
+# 疊圖比較模組--------------------------------------------------------------------------------------
+
+# 自動網格點數、包絡線百分位數、Excel疊圖最多繪製的追頻條數
+Overlay_points      = 2000
+Overlay_percentiles = (10, 50, 90)
+Overlay_series      = 100
+
+# 各組追頻時間 (以追頻開始為零點，秒) 串接 (全部資料) → 時間, 各組筆數, 各組時間長度
+def Overlay_time(all_data):
+    count = np.array([len(track["Timestamp"]) for track in all_data], dtype = np.int64)
+    time  = np.concatenate([track["Timestamp"] for track in all_data] + [np.zeros(0, "datetime64[ms]")]).astype("datetime64[ms]").astype(np.int64)
+    if len(time) == 0:
+        return time / 1000, count, np.full(len(count), -1.0)
+    
+    # 空的追頻時間長度為 -1
+    ends  = np.cumsum(count)
+    time  = (time - np.repeat(time[np.minimum(ends - count, len(time) - 1)], count)) / 1000
+    spans = np.where(count > 0, time[np.maximum(ends - 1, 0)], -1.0)
+    return time, count, spans
+
+# 共同時間網格 (全部資料, 網格間隔秒數，未指定時依最長追頻分成 Overlay_points 點) → 網格 (秒)
+def Overlay_grid(all_data, step = None):
+    time, count, spans = Overlay_time(all_data)
+    span = max(spans.max(initial = 0), 0)
+    step = step or (span / (Overlay_points - 1) if span > 0 else 1)
+    return np.arange(int(span / step + 1e-9) + 1) * step
+
+# 各組追頻內插到共同時間網格 (全部資料, 欄位, 網格) → 矩陣 (追頻 × 網格，超出該組時間為 NaN)
+def Overlay_matrix(all_data, name, grid):
+    time, count, spans = Overlay_time(all_data)
+    matrix = np.full((len(all_data), len(grid)), np.nan)
+    if len(time) == 0:
+        return matrix
+    
+    # 各組時間加上偏移串接為遞增序列，一次 np.interp 完成全部追頻的內插
+    offset = np.arange(len(all_data)) * (grid[-1] + 1)
+    values = np.concatenate([track[name] for track in all_data]).astype(np.float64)
+    matrix[:] = np.interp((offset[:, None] + grid).ravel(), time + np.repeat(offset, count), values).reshape(matrix.shape)
+    matrix[grid > spans[:, None]] = np.nan
+    return matrix
+
+# 包絡線：各網格點的追頻數、平均與百分位數 (矩陣) → {名稱: 陣列}
+def Overlay_envelope(matrix):
+    valid = ~np.isnan(matrix)
+    count = valid.sum(axis = 0)
+    envelope = {"count": count}
+    
+    with np.errstate(invalid = "ignore", divide = "ignore"):
+        envelope["mean"] = np.where(valid, matrix, 0).sum(axis = 0) / count
+    
+    # 百分位數：各網格點排序後 (NaN 排在最後) 依追頻數線性內插，同 np.nanpercentile 但不需逐欄處理
+    ordered = np.sort(matrix, axis = 0)
+    columns = np.arange(matrix.shape[1])
+    for p in Overlay_percentiles:
+        position = np.maximum(count - 1, 0) * p / 100
+        low  = np.floor(position).astype(np.int64)
+        high = np.ceil(position).astype(np.int64)
+        with np.errstate(invalid = "ignore"):
+            values = ordered[low, columns] + (ordered[high, columns] - ordered[low, columns]) * (position - low)
+        envelope[f"p{p}"] = np.where(count > 0, values, np.nan) # 沒有任何追頻的網格點為 NaN
+    return envelope
+
+# 各組追頻與包絡線的偏差：均方根、最大偏差、超出 p10~p90 的比例 (矩陣, 包絡線) → {名稱: 陣列}
+def Overlay_deviation(matrix, envelope):
+    valid = ~np.isnan(matrix)
+    count = valid.sum(axis = 1)
+    diff  = np.where(valid, matrix - envelope["mean"], 0)
+    low, high = envelope[f"p{Overlay_percentiles[0]}"], envelope[f"p{Overlay_percentiles[-1]}"]
+    
+    with np.errstate(invalid = "ignore", divide = "ignore"):
+        return {"rms":         np.sqrt((diff ** 2).sum(axis = 1) / count),
+                "max":         np.where(count > 0, np.abs(diff).max(axis = 1, initial = 0), np.nan),
+                "outside_pct": np.where(valid & ((matrix < low) | (matrix > high)), 1, 0).sum(axis = 1) / count * 100}
+
+# 疊圖比較：全部追頻對齊追頻開始時間後計算包絡線與偏差 (全部資料, 分頁名稱, 欄位, 網格間隔秒數) → 比較結果
+def Track_overlay(all_data, ws_titles, names = None, step = None):
+    names   = list(data_units) if names is None else names
+    grid    = Overlay_grid(all_data, step)
+    overlay = {"titles": list(ws_titles[:len(all_data)]), "names": list(names), "grid": grid, 
+               "matrix": {}, "envelope": {}, "deviation": {}}
+    
+    for name in names:
+        matrix = Overlay_matrix(all_data, name, grid)
+        overlay["matrix"][name]    = matrix
+        overlay["envelope"][name]  = Overlay_envelope(matrix)
+        overlay["deviation"][name] = Overlay_deviation(matrix, overlay["envelope"][name])
+    return overlay
+
+# 偏差表逐列輸出 (比較結果) → 標題列, 資料列...
+def Overlay_rows(overlay):
+    names = overlay["names"]
+    yield ["segment", "title"] + [f"{name}_{key}" for name in names for key in ["rms", "max", "outside_pct"]]
+    
+    columns = [[None if np.isnan(value) else round(value, 3) for value in overlay["deviation"][name][key].tolist()] 
+               for name in names for key in ["rms", "max", "outside_pct"]]
+    for i, row in enumerate(zip(*columns)):
+        yield [i, overlay["titles"][i]] + list(row)
+
+# 疊圖比較工作簿：第一頁為偏差表與各欄位疊圖，其後各欄位一頁 (網格、包絡線與各組追頻) (比較結果, 檔案路徑) → 檔案路徑
+def Overlay_file(overlay, save_path):
+    wb = Workbook(write_only = True)
+    grid = overlay["grid"].tolist()
+    
+    main = wb.create_sheet("Overlay")
+    for column, width in zip("AB", [9, 28]):
+        main.column_dimensions[column].width = width
+    for row in Overlay_rows(overlay):
+        main.append(row)
+    
+    for k, name in enumerate(overlay["names"]):
+        envelope = overlay["envelope"][name]
+        matrix   = overlay["matrix"][name]
+        keys     = ["mean"] + [f"p{p}" for p in Overlay_percentiles]
+        
+        ws = wb.create_sheet(name)
+        ws.append(["t_s"] + keys + overlay["titles"])
+        columns = [[None if np.isnan(value) else round(value, 3) for value in values.tolist()] 
+                   for values in [envelope[key] for key in keys] + list(matrix)]
+        for row in zip(grid, *columns):
+            ws.append(list(row))
+        
+        # 疊圖：各組追頻 (細灰線，最多 Overlay_series 條) 與包絡線
+        chart = LineChart()
+        chart.title = f"{name} overlay"
+        set_chart_title_size(chart, size = 1400)
+        chart.x_axis.title = "Time since track start [s]"
+        chart.y_axis.title = data_units[name]
+        chart.y_axis.majorGridlines = openpyxl.chart.axis.ChartLines()
+        
+        rows = len(grid) + 1
+        for column in range(len(keys) + 2, min(len(keys) + 2 + len(matrix), len(keys) + 2 + Overlay_series)):
+            series = Series(Reference(ws, min_col = column, min_row = 1, max_row = rows), title_from_data = True)
+            series.graphicalProperties.line = LineProperties(w = 3175, solidFill = "BFBFBF")
+            chart.append(series)
+        
+        for column, key in enumerate(keys, 2):
+            series = Series(Reference(ws, min_col = column, min_row = 1, max_row = rows), title_from_data = True)
+            series.graphicalProperties.line = LineProperties(w = 25400 if key == "mean" else 15875, 
+                                                             solidFill = colors[list(data_units).index(name)],
+                                                             prstDash = "solid" if key == "mean" else "dash")
+            chart.append(series)
+        
+        chart.set_categories(Reference(ws, min_col = 1, min_row = 2, max_row = rows))
+        chart.height = 15
+        chart.width  = 30
+        main.add_chart(chart, Drawing_adress(2 + 3 * len(overlay["names"])) + str(1 + k * 32))
+        ws.close()
+    
+    main.close()
+    wb.save(save_path)
+    return save_path
+
+# 疊圖比較檔案路徑 (輸出路徑)
+def Overlay_path(save_path):
+    base = save_path if os.path.isdir(save_path) else os.path.splitext(save_path)[0]
+    return base + "_Overlay.xlsx"
+
 # 起始/中止時間搜尋模組------------------------------------------------------------------------------
 
 def Search_time_gap(s_date, s_hr, s_min, s_sec, e_date, e_hr, e_min, e_sec):
@@ -371,22 +2059,851 @@ def Search_time_gap(s_date, s_hr, s_min, s_sec, e_date, e_hr, e_min, e_sec):
 
 # 預覽模組------------------------------------------------------------------------------------------
 
-# 提取資料
-def extract_data(all_data):
-    timestamps = [row[0] for row in all_data[1:]]
-    freq = [row[1] for row in all_data[1:]]
-    ifb  = [row[2] for row in all_data[1:]]
-    vfb  = [row[3] for row in all_data[1:]]
-    return timestamps, freq, ifb, vfb
+# 預覽降採樣金字塔，每層以4筆為一組保留最小值與最大值 (時間數值, 數值)
+class LOD_Pyramid:
+    factor = 4    # 每層合併筆數
+    coarse = 1024 # 最上層組數
+    
+    def __init__(self, x, y):
+        self.x = np.asarray(x, dtype = np.float64)
+        self.y = np.asarray(y)
+        
+        # 各層：(每組筆數, 最小值, 最大值)
+        self.levels = []
+        mins, maxs, size = self.y, self.y, 1
+        while len(mins) > self.coarse:
+            start = np.arange(0, len(mins), self.factor)
+            mins  = np.minimum.reduceat(mins, start)
+            maxs  = np.maximum.reduceat(maxs, start)
+            size *= self.factor
+            self.levels.append((size, mins, maxs))
+    
+    # 取得X軸範圍內的資料，選擇點數不超過上限的最細層 (X下限, X上限, 點數上限) → x, y
+    def fetch(self, x0, x1, points):
+        n  = len(self.x)
+        i0 = max(int(np.searchsorted(self.x, x0, "left")) - 1, 0)
+        i1 = min(int(np.searchsorted(self.x, x1, "right")) + 1, n)
+        
+        if i1 - i0 <= points or len(self.levels) == 0:
+            return self.x[i0:i1], self.y[i0:i1]
+        
+        for size, mins, maxs in self.levels:
+            if 2 * (i1 - i0) / size <= points:
+                break
+        
+        # 每組以組內第一筆時間，依序畫出最小值與最大值
+        j0, j1 = i0 // size, -(-i1 // size)
+        xs = np.repeat(self.x[np.arange(j0, j1) * size], 2)
+        ys = np.empty(2 * (j1 - j0), dtype = mins.dtype)
+        ys[0::2] = mins[j0:j1]
+        ys[1::2] = maxs[j0:j1]
+        return xs, ys
+
+# 預覽線條點數上限 (每像素2點)
+def LOD_points(ax):
+    return max(2 * int(ax.bbox.width), 200)
+
+# X軸範圍變更時，重新取得各線條資料 (座標軸)
+def LOD_refresh(ax):
+    x0, x1 = ax.get_xlim()
+    points = LOD_points(ax)
+    for axis in ax.figure.axes:
+        for line in axis.get_lines():
+            if hasattr(line, "lod"):
+                line.set_data(*line.lod.fetch(x0, x1, points))
+    ax.figure.canvas.draw_idle()
+
+# 連結X軸範圍變更事件 (座標軸)
+def LOD_connect(ax):
+    ax.callbacks.connect("xlim_changed", LOD_refresh)
+
+# 命令列模組---------------------------------------------------------------------------------------
+
+# 結束代碼：成功 / 處理失敗 / 參數錯誤 / 無追頻資料
+Exit_ok    = 0
+Exit_error = 1
+Exit_usage = 2
+Exit_empty = 3
+
+# 命令列時間參數 (文字) → 時間
+def CLI_time(text):
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            pass
+    raise argparse.ArgumentTypeError(f"時間格式錯誤：{text} (YYYY-MM-DD [HH:MM[:SS]])")
+
+# 命令列欄位參數 (文字) → 欄位清單
+def CLI_channels(text):
+    names = [name.strip().upper() for name in text.split(",") if name.strip()]
+    if len(names) == 0:
+        raise argparse.ArgumentTypeError("未選擇任何合併資料")
+    
+    for name in names:
+        if name not in data_units:
+            raise argparse.ArgumentTypeError(f"未知的欄位：{name} (可選：{', '.join(data_units)})")
+    
+    # 依FREQ / IFB / VFB順序
+    return [name for name in data_units if name in names]
+
+# 命令列參數
+def CLI_parser():
+    parser = argparse.ArgumentParser(prog = "UD7_HMI_convert", description = "UD7 HMI 監控資料轉換 (無GUI模式)")
+    parser.add_argument("folder", nargs = "*", help = "CSV資料夾路徑，可多個或使用萬用字元 (例如 D:/logs/UD7_*)")
+    parser.add_argument("-s", "--start", type = CLI_time, help = "起始時間 YYYY-MM-DD [HH:MM[:SS]] (預設：資料最早時間)")
+    parser.add_argument("-e", "--end",   type = CLI_time, help = "終止時間 YYYY-MM-DD [HH:MM[:SS]] (預設：資料最晚時間)")
+    parser.add_argument("-c", "--channels", type = CLI_channels, default = list(data_units), help = "輸出欄位，以逗號分隔 (預設：FREQ,IFB,VFB)")
+    parser.add_argument("-o", "--output",  help = "輸出路徑 (預設：資料夾/UD7_HMI_Output.xlsx)")
+    parser.add_argument("-f", "--format",  choices = ["xlsx"] + list(Columnar_formats), default = "xlsx", help = "輸出格式 (parquet / feather 需要 pyarrow)")
+    parser.add_argument("--per-segment", action = "store_true", help = "欄式輸出時，每組追頻一個檔案")
+    parser.add_argument("--shard", choices = list(Shard_policies), help = "Excel分檔方式：day (依日期) / segments (每檔追頻組數) / rows (每檔資料列數)，並另存索引工作簿")
+    parser.add_argument("--shard-size", type = int, help = "每檔追頻組數或資料列數 (預設：segments 200 / rows 1000000)")
+    parser.add_argument("--resample", type = int, default = None, metavar = "MS", help = "切分後重取樣為固定週期 (毫秒)，0為不重取樣 (預設：UD7_RESAMPLE_MS 或 0)")
+    parser.add_argument("--resample-method", choices = Resample_methods, default = None, help = "重取樣方法：hold (前值) / linear (線性內插) / mean (區間平均) (預設：UD7_RESAMPLE_METHOD 或 hold)")
+    parser.add_argument("--anomaly-z", type = float, default = None, help = "滑動視窗異常偵測z分數門檻，0為停用 (預設：UD7_ANOMALY_Z 或 0)")
+    parser.add_argument("--anomaly-window", type = int, default = None, help = "異常偵測前段視窗筆數 (預設：UD7_ANOMALY_WINDOW 或 50)")
+    parser.add_argument("--overlay", type = float, nargs = "?", const = 0, default = None, metavar = "STEP", help = "另存疊圖比較工作簿 (各組追頻對齊開始時間)，STEP為網格間隔秒數 (預設：自動)")
+    parser.add_argument("--profile", type = Profile_arg, nargs = "?", const = ["time"], default = None, metavar = "MODES", 
+                        help = "效能紀錄，報告存於輸出檔旁 <輸出檔名>_Profile.json：time / memory / cprofile，以逗號分隔 (預設：UD7_PROFILE 或停用)")
+    parser.add_argument("-w", "--workers", type = int, default = None, help = "解析行程數 (預設：UD7_WORKERS 或 CPU數)")
+    parser.add_argument("-l", "--list",    help = "資料夾清單檔 (每行一個路徑)")
+    parser.add_argument("-j", "--jobs",    type = int, default = 1, help = "批次模式同時處理的資料夾數 (預設：1)")
+    parser.add_argument("--force",   action = "store_true", help = "批次模式不略過輸入未變更的資料夾")
+    parser.add_argument("--summary", help = "批次摘要CSV檔 (各資料夾耗時與結果)")
+    parser.add_argument("--benchmark", metavar = "JSON", help = "效能測試：產生合成資料並量測各階段耗時與記憶體峰值，結果存為JSON")
+    parser.add_argument("--bench-sizes", type = lambda text: [Bench_size(size) for size in text.split(",")], default = [10000, 100000, 1000000], 
+                        help = "效能測試資料量，以逗號分隔 (預設：10k,100k,1M，最大可到 50M)")
+    parser.add_argument("--bench-files", type = int, default = 4, help = "效能測試每個資料量的CSV檔案數 (預設：4)")
+    parser.add_argument("--bench-tracks", type = int, default = None, help = "效能測試追頻組數 (預設：約80%%資料為追頻)")
+    parser.add_argument("--bench-track-rows", type = int, default = 800, help = "效能測試每組追頻資料筆數 (預設：800)")
+    parser.add_argument("--bench-mix", type = Bench_mix_arg, default = None, help = "追頻結束事件比例 (預設：stop=0.8,alarm=0.1,mode=0.05,start=0.05)")
+    parser.add_argument("--bench-stages", type = lambda text: text.split(","), default = None, help = f"效能測試階段 (預設：{','.join(Bench_stages)})")
+    parser.add_argument("--bench-no-memory", action = "store_true", help = "不量測記憶體峰值 (量測時每個資料量需多執行一次)")
+    parser.add_argument("--bench-dir", help = "合成資料位置 (指定時保留並重複使用，預設為暫存資料夾)")
+    parser.add_argument("--bench-compare", metavar = "JSON", help = "與先前的效能測試結果比較")
+    parser.add_argument("--log-file", help = "另存紀錄檔")
+    parser.add_argument("-v", "--verbose", action = "store_true", help = "顯示詳細紀錄")
+    return parser
+
+# 無GUI轉換 (路徑, 起始時間, 終止時間, 欄位, 輸出路徑, 行程數, 結果紀錄, 輸出格式, 每組追頻一個檔案, 分檔方式, 分檔數量, 異常偵測(門檻, 視窗), 疊圖網格間隔, 重取樣(週期, 方法)) → 結束代碼
+def UD7_convert(f_path, Start_time = None, End_time = None, names = None, save_path = None, workers = None, report = None, 
+                fmt = "xlsx", per_segment = False, shard = None, shard_size = None, anomaly = None, overlay = None, resample = None):
+    report = {} if report is None else report
+    
+    # 記錄錯誤並回傳結束代碼
+    def fail(code, message, exc_info = False):
+        report["message"] = message
+        log.error(message, exc_info = exc_info)
+        return code
+    
+    if not os.path.isdir(f_path):
+        return fail(Exit_error, f"找不到資料夾：{f_path}")
+    
+    if len(get_files_in_dir(f_path)) == 0:
+        return fail(Exit_error, f"資料夾路徑下，沒有.CSV檔存在：{f_path}")
+    
+    # 預設時間範圍為整個資料夾
+    probe = CSV_Probe(f_path)
+    if probe is None:
+        return fail(Exit_error, f"資料夾內沒有UD7監控資料：{f_path}")
+    
+    log.info("資料夾資訊：%s，%d 個檔案，約 %d 筆資料，欄位：%s", f_path, probe["files"], probe["rows"], ", ".join(probe["channels"]))
+    
+    if Start_time is None:
+        Start_time = probe["first"]
+    if End_time is None:
+        End_time = probe["last"]
+    
+    # 起始終止時間互換
+    if np.datetime64(End_time, "ms") < np.datetime64(Start_time, "ms"):
+        Start_time, End_time = End_time, Start_time
+    
+    if names is None:
+        names = list(data_units)
+    
+    # 取得合併的資料
+    try:
+        all_data, ws_titles, UD7_Error, end_kinds = UD7_HMI(f_path, Start_time, End_time, workers = workers, strict = True, ends = True)
+    except Exception as e:
+        return fail(Exit_error, f"合併資料時，發生錯誤：{e}", exc_info = True)
+    
+    # 重取樣為固定週期 (之後的統計、異常偵測與輸出皆使用重取樣資料)
+    period, method = resample or (Resample_period, Resample_method)
+    with Profile_stage("Resample"):
+        all_data = Resample_tracks(all_data, period, method)
+    if period > 0:
+        log.info("重取樣：每 %d ms (%s)，共 %d 筆", period, method, sum(len(track["Timestamp"]) for track in all_data))
+    
+    # 滑動視窗異常偵測，異常區間加入錯誤訊息
+    with Profile_stage("Anomaly"):
+        marks, ranges = Track_anomalies(all_data, *(anomaly or (None, None)))
+    UD7_Error = UD7_Error + Anomaly_text(ranges)
+    
+    for text in UD7_Error:
+        log.warning("追頻中發生錯誤：%s", text)
+    
+    report["tracks"] = len(all_data)
+    report["errors"] = len(UD7_Error)
+    
+    if all_data == []:
+        return fail(Exit_empty, f"數據未包含任何追頻資料 ({Time_text(np.datetime64(Start_time, 'ms'))} ~ {Time_text(np.datetime64(End_time, 'ms'))})")
+    
+    # 各組追頻統計
+    with Profile_stage("Track_stats"):
+        stats = Track_stats(all_data, ws_titles, UD7_Error, end_kinds)
+    
+    # 建立並儲存Excel / 欄式檔案，另存統計表CSV
+    try:
+        if fmt == "xlsx":
+            with Profile_stage("Column_select"):
+                sec_data = [{name: track[name] for name in ["Timestamp"] + names} for track in all_data]
+            if shard:
+                save_path = save_path or Excel_save_path(f_path)
+                paths = Excel_shards(sec_data, ws_titles, UD7_Error, end_kinds, save_path, shard, shard_size, workers, summary = stats, marks = marks)
+                log.info("分檔輸出：%d 個檔案", len(paths))
+            else:
+                tracks, titles, sources, parts = Excel_split(sec_data, ws_titles, marks)
+                with Profile_stage("Excel_file"):
+                    wb = Excel_file(tracks, titles, colors, linetypes, summary = stats, marks = parts, sources = sources)
+                save_path = Excel_save(wb, f_path, save_path)
+        else:
+            save_path = save_path or Output_path(f_path, fmt, per_segment)
+            Columnar_file(all_data, ws_titles, UD7_Error, end_kinds, save_path, fmt, names, per_segment)
+        
+        log.info("追頻統計：%s", Stats_csv(stats, Summary_path(save_path)))
+        
+        # 疊圖比較 (網格間隔 0 為自動)
+        if overlay is not None:
+            log.info("疊圖比較：%s", Overlay_file(Track_overlay(all_data, ws_titles, names, overlay or None), Overlay_path(save_path)))
+    except Exception as e:
+        return fail(Exit_error, f"儲存檔案時，發生錯誤：{e}", exc_info = True)
+    
+    report["output"] = save_path
+    log.info("成功合併檔案：%s (%d 組追頻，%d 項錯誤)", save_path, len(all_data), len(UD7_Error))
+    return Exit_ok
+
+# 批次模組-----------------------------------------------------------------------------------------
+
+# 批次結果狀態
+Batch_status = {Exit_ok: "完成", Exit_error: "失敗", Exit_empty: "無追頻資料"}
+
+# 展開資料夾參數，支援萬用字元與清單檔 (路徑清單, 清單檔) → 資料夾清單
+def Batch_folders(patterns, list_file = None):
+    patterns = list(patterns)
+    if list_file:
+        with open(list_file, encoding = "utf-8") as file:
+            patterns += [line.strip() for line in file if line.strip() and not line.startswith("#")]
+    
+    folders = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        for folder in matches:
+            if os.path.isdir(folder) or not glob.has_magic(pattern):
+                folder = os.path.normpath(folder)
+                if folder not in folders:
+                    folders.append(folder)
+    return folders
+
+# 輸入指紋：資料夾CSV檔案 + 轉換參數與影響輸出的環境變數設定 (路徑, 起始時間, 終止時間, 欄位, 輸出格式, 每組追頻一個檔案, 分檔方式, 分檔數量, 異常偵測, 疊圖網格間隔, 重取樣) → 文字
+def Batch_stamp(f_path, Start_time, End_time, names, fmt = "xlsx", per_segment = False, shard = None, shard_size = None, anomaly = None, overlay = None, resample = None):
+    anomaly  = (Anomaly_z, Anomaly_window) if anomaly is None else anomaly
+    resample = (Resample_period, Resample_method) if resample is None else resample
+    key = (Cache_version, sorted(Folder_fingerprint(f_path)), str(Start_time), str(End_time), list(names), fmt, per_segment, shard, shard_size, 
+           anomaly, overlay, resample, 
+           Chart_points, Lock_tolerance, Lock_window) # 環境變數設定 (圖表點數上限 / 鎖頻分析) 也會改變輸出
+    return hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+
+# 單一資料夾批次工作，輸入未變更時略過 (路徑, 起始時間, 終止時間, 欄位, 行程數, 強制執行, 輸出格式, 每組追頻一個檔案, 分檔方式, 分檔數量, 異常偵測, 疊圖網格間隔, 重取樣, 效能紀錄模式) → 結果紀錄
+def Batch_job(f_path, Start_time, End_time, names, workers, force = False, fmt = "xlsx", per_segment = False, shard = None, shard_size = None, 
+              anomaly = None, overlay = None, resample = None, profile = None):
+    begin  = time.perf_counter()
+    output = Output_path(f_path, fmt, per_segment)
+    report = {"folder": f_path, "status": "", "code": Exit_error, "seconds": 0.0,
+              "tracks": "", "errors": "", "output": output, "message": ""}
+    
+    try:
+        stamp      = Batch_stamp(f_path, Start_time, End_time, names, fmt, per_segment, shard, shard_size, anomaly, overlay, resample)
+        stamp_path = output + ".stamp"
+        
+        previous = None
+        if not force and os.path.exists(output) and os.path.exists(stamp_path):
+            with open(stamp_path, encoding = "utf-8") as file:
+                previous = file.read().strip()
+        
+        if previous == stamp:
+            report["status"] = "略過"
+            report["code"]   = Exit_ok
+            log.info("輸入未變更，略過：%s", f_path)
+            
+        else:
+            # 效能紀錄存於各資料夾報表旁
+            Profile_start(profile)
+            try:
+                report["code"] = UD7_convert(f_path, Start_time, End_time, names, None, workers, report, fmt, per_segment, shard, shard_size, anomaly, overlay, resample)
+            finally:
+                Profile_finish(report["output"])
+            report["status"] = Batch_status.get(report["code"], "失敗")
+            
+            # 成功後記錄輸入指紋
+            if report["code"] == Exit_ok:
+                with open(stamp_path, "w", encoding = "utf-8") as file:
+                    file.write(stamp)
+            
+    except Exception as e:
+        report["status"]  = "失敗"
+        report["code"]    = Exit_error
+        report["message"] = str(e)
+        log.exception("批次處理時，發生錯誤：%s", f_path)
+    
+    report["seconds"] = round(time.perf_counter() - begin, 3)
+    return report
+
+# 子行程紀錄設定 (紀錄等級)
+def Batch_init(level):
+    logging.basicConfig(level = level, format = "%(asctime)s %(levelname)s [%(processName)s] %(message)s")
+
+# 批次轉換多個資料夾 (資料夾清單, 起始時間, 終止時間, 欄位, 每資料夾行程數, 同時處理數, 強制執行, 摘要檔, 輸出格式, 每組追頻一個檔案, 分檔方式, 分檔數量, 異常偵測, 疊圖網格間隔, 重取樣, 效能紀錄模式) → 結束代碼
+def UD7_batch(folders, Start_time = None, End_time = None, names = None, workers = None, jobs = 1, force = False, summary_path = None, 
+              fmt = "xlsx", per_segment = False, shard = None, shard_size = None, anomaly = None, overlay = None, resample = None, profile = None):
+    names = list(data_units) if names is None else names
+    jobs  = max(1, min(jobs, len(folders)))
+    
+    # 同時處理多個資料夾時，平均分配解析行程數
+    if workers is None and jobs > 1:
+        workers = max(1, (Workers if Workers > 0 else (os.cpu_count() or 1)) // jobs)
+    
+    log.info("批次處理：%d 個資料夾，同時處理 %d 個", len(folders), jobs)
+    begin   = time.perf_counter()
+    reports = []
+    
+    if jobs == 1:
+        for folder in folders:
+            reports.append(Batch_job(folder, Start_time, End_time, names, workers, force, fmt, per_segment, shard, shard_size, anomaly, overlay, resample, profile))
+    
+    else:
+        with ProcessPoolExecutor(max_workers = jobs, initializer = Batch_init, initargs = (log.getEffectiveLevel(),)) as executor:
+            futures = {executor.submit(Batch_job, folder, Start_time, End_time, names, workers, force, fmt, per_segment, shard, shard_size, anomaly, overlay, resample, profile): folder 
+                       for folder in folders}
+            for future in as_completed(futures):
+                try:
+                    report = future.result()
+                except Exception as e:
+                    report = {"folder": futures[future], "status": "失敗", "code": Exit_error, "seconds": "",
+                              "tracks": "", "errors": "", "output": "", "message": str(e)}
+                log.info("%s：%s (%s 秒)", report["folder"], report["status"], report["seconds"])
+                reports.append(report)
+        
+        # 依輸入順序排列
+        reports.sort(key = lambda report: folders.index(report["folder"]))
+    
+    # 摘要
+    log.info("批次完成，共 %.1f 秒：", time.perf_counter() - begin)
+    for report in reports:
+        log.info("  %-8s %8s 秒  %s 組追頻  %s", report["status"], report["seconds"], report["tracks"] if report["tracks"] != "" else "-", report["folder"])
+    
+    if summary_path:
+        fields = ["folder", "status", "code", "seconds", "tracks", "errors", "output", "message"]
+        with open(summary_path, "w", newline = "", encoding = "utf-8-sig") as file:
+            writer = csv.DictWriter(file, fieldnames = fields, extrasaction = "ignore")
+            writer.writeheader()
+            writer.writerows(reports)
+        log.info("批次摘要：%s", summary_path)
+    
+    codes = [report["code"] for report in reports]
+    if Exit_error in codes:
+        return Exit_error
+    if Exit_empty in codes:
+        return Exit_empty
+    return Exit_ok
+
+# 效能測試模組--------------------------------------------------------------------------------------
+
+# 合成資料：追頻結束事件比例 (start：未送出停止命令，直接開始下一組追頻)、閒置狀態訊息
+Bench_mix   = {"stop": 0.8, "alarm": 0.1, "mode": 0.05, "start": 0.05}
+Bench_idle  = "Status updated: ModeStatus=0. Errorcode=0"
+Bench_alarm = UD7Alarm + ": Overcurrent"
+
+# 效能測試階段
+Bench_stages = ["CSV_Merge", "UD7_HMI", "Track_stats", "Drawing", "Excel_file", "Excel_save"]
+
+# 資料筆數參數 (文字，例如 10k / 1.5M) → 筆數
+def Bench_size(text):
+    text  = text.strip().lower()
+    scale = {"k": 1000, "m": 1000000}.get(text[-1:], 1)
+    try:
+        return int(float(text.rstrip("km")) * scale)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"筆數格式錯誤：{text} (例如 10k、1M)")
+
+# 結束事件比例參數 (文字，例如 stop=0.8,alarm=0.2) → 比例
+def Bench_mix_arg(text):
+    mix = {}
+    for item in text.split(","):
+        kind, _, value = item.partition("=")
+        if kind.strip() not in Bench_mix:
+            raise argparse.ArgumentTypeError(f"未知的結束事件：{kind} (可選：{', '.join(Bench_mix)})")
+        mix[kind.strip()] = float(value)
+    return mix
+
+# 產生合成UD7 HMI監控資料夾 (資料夾, 檔案數, 總筆數, 追頻組數, 每組資料筆數, 結束事件比例, 亂數種子) → 資料夾資訊
+# 每組追頻：閒置訊息 → StartTrack → ModeStatus=52資料 → 結束事件；追頻組數未指定時約 80% 為追頻資料
+def Bench_generate(folder, files = 4, rows = 100000, tracks = None, track_rows = 800, mix = None, seed = 0):
+    mix    = mix or Bench_mix
+    rng    = np.random.default_rng(seed)
+    tracks = tracks if tracks is not None else max(1, int(rows * 0.8) // (track_rows + 2))
+    idle   = rows - tracks * (track_rows + 2)
+    if idle < 0:
+        raise ValueError(f"總筆數 {rows} 不足 {tracks} 組 x {track_rows} 筆追頻資料")
+    
+    # 事件代碼：0 閒置、1 StartTrack、2 資料、3~5 結束事件
+    texts = [Bench_idle, StartTrack, ModeStatus52, StopCommand, Bench_alarm, Mode_changed]
+    kinds = list(mix)
+    p     = np.array([mix[kind] for kind in kinds], dtype = np.float64)
+    ends  = np.array([{"stop": 3, "alarm": 4, "mode": 5, "start": 0}[kind] for kind in kinds])[rng.choice(len(kinds), tracks, p = p / p.sum())]
+    gaps  = rng.multinomial(idle, np.full(tracks + 1, 1 / (tracks + 1)))
+    
+    codes  = np.column_stack((np.zeros(tracks, dtype = np.int64), np.ones(tracks, dtype = np.int64), np.full(tracks, 2), ends)).ravel()
+    counts = np.column_stack((gaps[:-1], np.ones(tracks, dtype = np.int64), np.full(tracks, track_rows), np.ones(tracks, dtype = np.int64))).ravel()
+    event  = np.append(np.repeat(codes, counts), np.zeros(gaps[-1], dtype = np.int64)).astype(np.int8)
+    
+    # 時間間隔 20~300ms，資料列數值 (大資料量時使用較小的型別)
+    time = np.datetime64("2024-01-01T00:00:00", "ms") + np.cumsum(rng.integers(20, 300, rows, dtype = np.int32), dtype = np.int64).astype("timedelta64[ms]")
+    data = event == 2
+    FREQ = (20000 + rng.normal(0, 40, rows).astype(np.float32)).round().astype(np.int32)
+    IFB  = rng.integers(300, 900, rows, dtype = np.int16)
+    VFB  = rng.integers(0, 100, rows, dtype = np.int16)
+    
+    os.makedirs(folder, exist_ok = True)
+    size = 0
+    for k, part in enumerate(np.array_split(np.arange(rows), files)):
+        path = os.path.join(folder, f"UD7_HMI_{k + 1:03d}.csv")
+        with open(path, "w", newline = "", encoding = "utf-8") as file:
+            file.write("No,Time,Level,Source,Code,Description,VFB,IFB,FREQ\r\n")
+            for block in np.array_split(part, max(1, len(part) // 100000)):
+                stamps = np.datetime_as_string(time[block], unit = "ms").tolist()
+                values = [np.where(data[block], column[block].astype(str), "").tolist() for column in (VFB, IFB, FREQ)]
+                lines  = [f"{n + 1},{t[:10]} {t[11:]},{'E' if e == 4 else 'I'},HMI,0,{texts[e]},{v},{i},{f}\r\n"
+                          for n, t, e, v, i, f in zip(block.tolist(), stamps, event[block].tolist(), *values)]
+                file.write("".join(lines))
+        size += os.path.getsize(path)
+    
+    return {"folder": folder, "files": files, "rows": rows, "tracks": tracks, "track_rows": track_rows, 
+            "mix": dict(mix), "seed": seed, "csv_mb": round(size / 1048576, 1)}
+
+# 單一階段計時，可選記錄記憶體峰值 (tracemalloc，含numpy配置) (結果, 階段名稱, 函式, 記錄記憶體) → 函式回傳值
+def Bench_stage(result, name, func, memory = False):
+    gc.collect()
+    if memory:
+        tracemalloc.start()
+    
+    # 切分時的錯誤訊息不輸出
+    with contextlib.redirect_stdout(io.StringIO()):
+        begin = time.perf_counter()
+        value = func()
+        seconds = time.perf_counter() - begin
+    
+    stage = result.setdefault(name, {})
+    if memory:
+        stage["peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 1048576, 1)
+        tracemalloc.stop()
+    else:
+        stage["seconds"] = round(seconds, 3)
+    
+    log.info("  %-12s %s", name, f"{stage['peak_mb']} MB" if memory else f"{seconds:.3f} 秒")
+    return value
+
+# 執行一次完整流程 (資料夾, 結果, 階段, 行程數, 記錄記憶體)
+def Bench_pipeline(folder, result, stages, workers, memory = False):
+    global Workers
+    probe   = CSV_Probe(folder)
+    saved   = Workers
+    Workers = 1 if memory else (workers if workers is not None else Workers) # 記錄記憶體時於本行程解析 (子行程不計入)
+    
+    try:
+        if "CSV_Merge" in stages:
+            CSV_extents.clear()
+            Bench_stage(result, "CSV_Merge", lambda: CSV_Merge(folder), memory)
+        
+        CSV_extents.clear()
+        Session_cache.clear()
+        all_data, ws_titles, UD7_Error, end_kinds = Bench_stage(result, "UD7_HMI", lambda: UD7_HMI(folder, probe["first"], probe["last"], strict = True, ends = True), memory)
+        result["tracks"] = len(all_data)
+        
+        if "Track_stats" in stages:
+            stats = Bench_stage(result, "Track_stats", lambda: Track_stats(all_data, ws_titles, UD7_Error, end_kinds), memory)
+        else:
+            stats = None
+        
+        tracks, titles, sources = Excel_split(all_data, ws_titles)[:3]
+        if "Drawing" in stages:
+            ws = Workbook(write_only = True).create_sheet()
+            Bench_stage(result, "Drawing", lambda: [Drawing(track, colors, linetypes, ws, Chart_index(track, Chart_points)) for track in tracks], memory)
+        
+        if "Excel_file" in stages or "Excel_save" in stages:
+            wb = Bench_stage(result, "Excel_file", lambda: Excel_file(tracks, titles, colors, linetypes, summary = stats, sources = sources), memory)
+            if "Excel_save" in stages:
+                path = os.path.join(folder, "UD7_HMI_Output.xlsx")
+                Bench_stage(result, "Excel_save", lambda: wb.save(path), memory)
+                result["xlsx_mb"] = round(os.path.getsize(path) / 1048576, 1)
+                os.remove(path)
+    finally:
+        Workers = saved
+
+# 效能測試：各資料量產生合成資料並量測各階段耗時與記憶體峰值，結果存為JSON
+# (輸出檔, 資料量清單, 檔案數, 每組資料筆數, 追頻組數, 結束事件比例, 階段, 行程數, 記錄記憶體, 合成資料位置, 比較檔) → 結束代碼
+def UD7_benchmark(save_path, sizes, files = 4, track_rows = 800, tracks = None, mix = None, stages = None, workers = None, 
+                  memory = True, bench_dir = None, compare = None):
+    stages = stages or Bench_stages
+    keep   = bench_dir is not None
+    root   = bench_dir or tempfile.mkdtemp(prefix = "UD7_bench_")
+    
+    # 不使用快取，每次皆重新解析 (子行程以spawn啟動時重新讀取環境變數，需一併停用)
+    global Cache_dir
+    cache, Cache_dir = Cache_dir, ""
+    cache_env = os.environ.get("UD7_CACHE_DIR")
+    os.environ["UD7_CACHE_DIR"] = ""
+    
+    version = re.search(r"Version：(\S+)", __doc__ or "")
+    report  = {"version":  version.group(1) if version else "",
+               "created":  datetime.now().isoformat(timespec = "seconds"),
+               "platform": {"python": sys.version.split()[0], "numpy": np.__version__, "openpyxl": openpyxl.__version__,
+                            "system": platform.platform(), "cpus": os.cpu_count(), "workers": workers if workers is not None else Workers},
+               "settings": {"files": files, "track_rows": track_rows, "tracks": tracks, "mix": mix or Bench_mix, "stages": stages, "memory": memory},
+               "results":  []}
+    
+    try:
+        for rows in sizes:
+            folder = os.path.join(root, f"rows_{rows}")
+            log.info("效能測試：%d 筆", rows)
+            
+            begin = time.perf_counter()
+            if not (keep and os.path.exists(folder)):
+                info = Bench_generate(folder, files, rows, tracks, track_rows, mix)
+            else:
+                info = {"folder": folder, "files": files, "rows": rows}
+            log.info("  產生資料     %.3f 秒", time.perf_counter() - begin)
+            
+            result = {"rows": rows, "files": files, "csv_mb": info.get("csv_mb"), "stages": {}}
+            Bench_pipeline(folder, result["stages"], stages, workers)
+            if memory:
+                Bench_pipeline(folder, result["stages"], stages, workers, memory = True)
+            
+            for key in ["tracks", "xlsx_mb"]:
+                if key in result["stages"]:
+                    result[key] = result["stages"].pop(key)
+            report["results"].append(result)
+            
+            if not keep:
+                shutil.rmtree(folder, ignore_errors = True)
+    finally:
+        Cache_dir = cache
+        if cache_env is None:
+            os.environ.pop("UD7_CACHE_DIR", None)
+        else:
+            os.environ["UD7_CACHE_DIR"] = cache_env
+        if not keep:
+            shutil.rmtree(root, ignore_errors = True)
+    
+    with open(save_path, "w", encoding = "utf-8") as file:
+        json.dump(report, file, ensure_ascii = False, indent = 2)
+    log.info("效能測試結果：%s", save_path)
+    
+    if compare:
+        Bench_compare(compare, report)
+    return Exit_ok
+
+# 比較兩次效能測試結果，列出相同資料量各階段的耗時與記憶體比值 (舊結果檔, 新結果) → 比較清單
+def Bench_compare(old_path, report, threshold = 1.1):
+    with open(old_path, encoding = "utf-8") as file:
+        old = {result["rows"]: result for result in json.load(file)["results"]}
+    
+    rows = []
+    for result in report["results"]:
+        if result["rows"] not in old:
+            continue
+        for name, stage in result["stages"].items():
+            before = old[result["rows"]]["stages"].get(name, {})
+            for key in ["seconds", "peak_mb"]:
+                if stage.get(key) is not None and before.get(key):
+                    ratio = stage[key] / before[key]
+                    rows.append((result["rows"], name, key, before[key], stage[key], ratio))
+                    log.log(logging.WARNING if ratio > threshold else logging.INFO, "%10d 筆 %-12s %-8s %10s → %-10s x%.2f%s", 
+                            result["rows"], name, key, before[key], stage[key], ratio, "  (變差)" if ratio > threshold else "")
+    return rows
+
+# 命令列進入點 (參數) → 結束代碼
+def CLI_main(argv = None):
+    parser = CLI_parser()
+    try:
+        args = parser.parse_args(argv)
+        folders = Batch_folders(args.folder, args.list)
+        
+        batch = len(folders) > 1 or args.list or args.summary
+        if batch and args.output:
+            parser.error("多個資料夾時不可指定 --output")
+        if len(folders) == 0 and not args.benchmark:
+            parser.error("沒有符合的資料夾")
+        
+    except SystemExit as e:
+        return Exit_ok if e.code == 0 else Exit_usage
+    
+    handlers = [logging.StreamHandler()]
+    if args.log_file:
+        handlers.append(logging.FileHandler(args.log_file, encoding = "utf-8"))
+    logging.basicConfig(level = logging.DEBUG if args.verbose else logging.INFO, 
+                        format = "%(asctime)s %(levelname)s %(message)s", handlers = handlers)
+    
+    if args.benchmark:
+        return UD7_benchmark(args.benchmark, args.bench_sizes, args.bench_files, args.bench_track_rows, args.bench_tracks, args.bench_mix, 
+                             args.bench_stages, args.workers, not args.bench_no_memory, args.bench_dir, args.bench_compare)
+    
+    # 異常偵測參數，未指定時使用環境變數
+    anomaly = (Anomaly_z if args.anomaly_z is None else args.anomaly_z, 
+               Anomaly_window if args.anomaly_window is None else args.anomaly_window)
+    resample = (Resample_period if args.resample is None else args.resample, args.resample_method or Resample_method)
+    
+    if batch:
+        return UD7_batch(folders, args.start, args.end, args.channels, args.workers, args.jobs, args.force, args.summary, 
+                         args.format, args.per_segment, args.shard, args.shard_size, anomaly, args.overlay, resample, args.profile)
+    
+    # 效能紀錄 (--profile 或環境變數 UD7_PROFILE)，報告存於輸出檔旁
+    report = {}
+    Profile_start(args.profile)
+    try:
+        return UD7_convert(folders[0], args.start, args.end, args.channels, args.output, args.workers, report, 
+                           args.format, args.per_segment, args.shard, args.shard_size, anomaly, args.overlay, resample)
+    finally:
+        Profile_finish(report.get("output") or args.output or Output_path(folders[0], args.format, args.per_segment))
 
 # GUI介面------------------------------------------------------------------------------------------
 
+# 載入GUI相關套件
+def Load_GUI():
+    global Figure, FigureCanvasTkAgg, NavigationToolbar2Tk, DateFormatter, date2num, LineCollection, DateEntry, tk, ttk, filedialog, messagebox
+    
+    from matplotlib.figure import Figure
+    from matplotlib.collections import LineCollection
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk # 預覽嵌入Tk視窗
+    from matplotlib.dates import DateFormatter, date2num
+    
+    from tkcalendar import DateEntry
+    
+    import tkinter as tk
+    from tkinter import ttk, filedialog, messagebox
+
+# 預覽視窗：單一視窗切換各組追頻，重複使用圖表並直接更新線條資料 (主視窗)
+class Preview_Window:
+    # 各欄位單位與顏色
+    units = {"FREQ": " [Hz]", "IFB": " [mA]", "VFB": " [%]"}
+    
+    def __init__(self, root):
+        self.top = tk.Toplevel(root)
+        self.top.title("UD7 HMI preview")
+        self.top.geometry("1280x680")
+        self.top.protocol("WM_DELETE_WINDOW", self.top.withdraw) # 關閉時隱藏，下次預覽重複使用
+        
+        self.all_data  = []
+        self.ws_titles = []
+        self.lines     = []
+        self.index     = 0
+        
+        # 追頻清單
+        self.list_frame = ttk.Frame(self.top)
+        self.list_frame.pack(side = "left", fill = "y", padx = 5, pady = 5)
+        
+        self.scrollbar = ttk.Scrollbar(self.list_frame, orient = "vertical")
+        self.listbox = tk.Listbox(self.list_frame, width = 30, selectmode = "extended", exportselection = False, yscrollcommand = self.scrollbar.set)
+        self.scrollbar.config(command = self.listbox.yview)
+        self.listbox.pack(side = "left", fill = "y")
+        self.scrollbar.pack(side = "left", fill = "y")
+        self.listbox.bind("<<ListboxSelect>>", lambda event: self.show(self.listbox.curselection()[0]) if self.listbox.curselection() else None)
+        
+        # 切換按鈕
+        self.nav_frame = ttk.Frame(self.top)
+        self.nav_frame.pack(side = "bottom", fill = "x", padx = 5, pady = 5)
+        
+        self.prev_button = ttk.Button(self.nav_frame, text = "◀ 上一組", command = lambda: self.show(self.index - 1), width = 10)
+        self.next_button = ttk.Button(self.nav_frame, text = "下一組 ▶", command = lambda: self.show(self.index + 1), width = 10)
+        self.page_label  = tk.Label(self.nav_frame, text = "")
+        self.overlay_button = ttk.Button(self.nav_frame, text = "疊圖比較", command = self.overlay, width = 10)
+        self.prev_button.pack(side = "left", padx = 5)
+        self.next_button.pack(side = "left", padx = 5)
+        self.page_label.pack (side = "left", padx = 10)
+        self.overlay_button.pack(side = "right", padx = 5)
+        
+        self.top.bind("<Left>",  lambda event: self.show(self.index - 1))
+        self.top.bind("<Right>", lambda event: self.show(self.index + 1))
+        
+        # 圖表 (只建立一次)
+        self.fig = Figure(figsize = (12, 6))
+        self.ax1 = self.fig.add_subplot(111)
+        self.ax2 = self.ax1.twinx()
+        
+        self.canvas = FigureCanvasTkAgg(self.fig, master = self.top)
+        self.toolbar = NavigationToolbar2Tk(self.canvas, self.top, pack_toolbar = False)
+        self.toolbar.pack(side = "bottom", fill = "x")
+        self.canvas.get_tk_widget().pack(side = "top", fill = "both", expand = True)
+        
+        # 時間格式化，縮放/平移時依X軸範圍更新解析度
+        self.ax1.xaxis_date()
+        self.ax1.xaxis.set_major_formatter(DateFormatter('%Y-%m-%d %H:%M:%S'))
+        LOD_connect(self.ax1)
+    
+    # 視窗是否仍存在
+    def exists(self):
+        try:
+            return bool(self.top.winfo_exists())
+        except tk.TclError:
+            return False
+    
+    # 載入切分結果並設定線條 (全部資料, 分頁名稱, 顯示欄位)
+    def load(self, all_data, ws_titles, names):
+        # 未選擇顯示欄位時不更新
+        if not names:
+            return
+        
+        self.all_data  = all_data
+        self.ws_titles = ws_titles
+        
+        # 依顯示欄位重新建立線條 (左Y軸第一個欄位，右Y軸其餘欄位)
+        for line in self.lines:
+            line.remove()
+        self.lines = []
+        
+        for k, name in enumerate(names):
+            ax = self.ax1 if k == 0 else self.ax2
+            color = "#" + colors[list(data_units).index(name)]
+            line, = ax.plot([], [], label = name, color = color, linewidth = 1)
+            line.name = name
+            self.lines.append(line)
+        
+        first = self.lines[0]
+        self.ax1.set_xlabel("Timestamp")
+        self.ax1.set_ylabel(first.name + self.units[first.name], color = first.get_color())
+        self.ax1.tick_params(axis = 'y', labelcolor = first.get_color())
+        self.ax1.grid(True)
+        self.ax1.legend(loc = "upper left")
+        
+        right = self.lines[1:]
+        self.ax2.set_visible(len(right) > 0)
+        if right:
+            self.ax2.set_ylabel("\n".join(line.name + self.units[line.name] for line in right), color = right[0].get_color())
+            self.ax2.tick_params(axis = 'y', labelcolor = right[0].get_color())
+            self.ax2.legend(loc = "upper right")
+        
+        self.listbox.delete(0, tk.END)
+        for title in ws_titles:
+            self.listbox.insert(tk.END, title)
+        
+        self.top.deiconify()
+        self.top.lift()
+        self.fig.tight_layout()
+        self.show(0)
+    
+    # 顯示單組追頻，只更新線條資料與座標範圍 (追頻編號)
+    def show(self, index):
+        if len(self.all_data) == 0:
+            return
+        
+        self.index = index = min(max(index, 0), len(self.all_data) - 1)
+        track = self.all_data[index]
+        x = date2num(track["Timestamp"])
+        
+        for line in self.lines:
+            line.lod = LOD_Pyramid(x, track[line.name])
+        
+        if len(x) > 0:
+            # 單筆資料時前後各加1秒
+            x0, x1 = (x[0], x[-1]) if x[-1] > x[0] else (x[0] - 1 / 86400, x[0] + 1 / 86400)
+            self.ax1.set_xlim(x0, x1) # 觸發 LOD_refresh 更新線條
+            LOD_refresh(self.ax1)
+        else:
+            for line in self.lines:
+                line.set_data([], [])
+        
+        # Y軸依資料範圍調整
+        for ax in (self.ax1, self.ax2):
+            ax.relim()
+            ax.autoscale_view(scalex = False)
+        
+        self.fig.suptitle(self.ws_titles[index])
+        self.page_label.config(text = f"{index + 1} / {len(self.all_data)}  ({len(x)} 筆)")
+        self.prev_button.config(state = "normal" if index > 0 else "disabled")
+        self.next_button.config(state = "normal" if index < len(self.all_data) - 1 else "disabled")
+        
+        # 多選 (疊圖比較) 時保留選取範圍
+        if index not in self.listbox.curselection():
+            self.listbox.selection_clear(0, tk.END)
+            self.listbox.selection_set(index)
+        self.listbox.see(index)
+        
+        # 重設工具列的縮放紀錄 (首頁為目前追頻)
+        self.toolbar.update()
+        self.canvas.draw_idle()
+    
+    # 疊圖比較：清單選取多組時比較選取的追頻，否則比較全部追頻
+    def overlay(self):
+        if len(self.all_data) == 0:
+            return
+        
+        selected = list(self.listbox.curselection())
+        index = selected if len(selected) > 1 else range(len(self.all_data))
+        overlay = Track_overlay([self.all_data[i] for i in index], [self.ws_titles[i] for i in index], [line.name for line in self.lines])
+        Overlay_Window(self.top, overlay)
+
+# 疊圖比較視窗：各欄位一張圖，各組追頻對齊開始時間疊圖並顯示包絡線 (主視窗, 比較結果)
+class Overlay_Window:
+    def __init__(self, root, overlay):
+        names = overlay["names"]
+        grid  = overlay["grid"]
+        low, high = f"p{Overlay_percentiles[0]}", f"p{Overlay_percentiles[-1]}"
+        
+        self.top = tk.Toplevel(root)
+        self.top.title(f"UD7 HMI overlay ({len(overlay['titles'])} 組追頻)")
+        self.top.geometry("1280x680")
+        
+        self.fig = Figure(figsize = (12, 6))
+        axes = self.fig.subplots(len(names), 1, sharex = True, squeeze = False)[:, 0]
+        
+        for ax, name in zip(axes, names):
+            matrix   = overlay["matrix"][name]
+            envelope = overlay["envelope"][name]
+            color    = "#" + colors[list(data_units).index(name)]
+            
+            # 各組追頻以 LineCollection 一次繪製
+            lines = [np.column_stack((grid, row))[~np.isnan(row)] for row in matrix]
+            ax.add_collection(LineCollection(lines, colors = "0.6", linewidths = 0.5, alpha = 0.5))
+            ax.fill_between(grid, envelope[low], envelope[high], color = color, alpha = 0.25, label = f"{low} ~ {high}")
+            ax.plot(grid, envelope["mean"], color = color, linewidth = 1.5, label = "mean")
+            ax.autoscale_view()
+            
+            ax.set_ylabel(name + Preview_Window.units[name], color = color)
+            ax.grid(True)
+            ax.legend(loc = "upper right")
+        axes[-1].set_xlabel("Time since track start [s]")
+        
+        # 與平均偏差 (均方根) 最大的追頻
+        rms   = overlay["deviation"][names[0]]["rms"]
+        worst = [i for i in np.argsort(-np.nan_to_num(rms, nan = -1))[:5] if not np.isnan(rms[i])]
+        text  = "、".join(f"{overlay['titles'][i]} ({rms[i]:.1f})" for i in worst)
+        self.label = tk.Label(self.top, text = f"{names[0]} 偏差最大：{text}", anchor = "w")
+        self.label.pack(side = "bottom", fill = "x", padx = 5)
+        
+        self.canvas  = FigureCanvasTkAgg(self.fig, master = self.top)
+        self.toolbar = NavigationToolbar2Tk(self.canvas, self.top, pack_toolbar = False)
+        self.toolbar.pack(side = "bottom", fill = "x")
+        self.canvas.get_tk_widget().pack(side = "top", fill = "both", expand = True)
+        
+        self.fig.tight_layout()
+        self.canvas.draw_idle()
+
 class UD7_HMI_App:
     def __init__(self, root):
         self.root = root
         self.root.title("UD7 HMI convert")
         self.window_width = 310
-        self.window_height = 380
+        self.window_height = 435
         self.root.geometry(f"{self.window_width}x{self.window_height}")  # 設置窗口大小
         self.root.resizable(False, False) # 限制視窗大小
 
@@ -520,9 +3037,27 @@ class UD7_HMI_App:
         self.e_minute_spinbox.grid(row = 4, column = 2, padx = 5, pady = 5, sticky = "w")
         self.e_second_spinbox.grid(row = 4, column = 3, padx = 5, pady = 5, sticky = "w")
 
+        # 進度框架
+        self.progress_frame = ttk.Frame(self.root)
+        self.progress_frame.place(x = 15, y = 335, width = 280, height = 55)
+        
+        self.progress_var = tk.DoubleVar(value = 0)
+        self.progress_bar = ttk.Progressbar(self.progress_frame, variable = self.progress_var, maximum = 100, length = 205)
+        self.progress_bar.grid(row = 0, column = 0, padx = 5, pady = 2)
+        
+        self.cancel_button = ttk.Button(self.progress_frame, text = "取消", command = self.cancel_action, width = 6, state = "disabled")
+        self.cancel_button.grid(row = 0, column = 1, padx = 0, pady = 2)
+        
+        self.status_label = tk.Label(self.progress_frame, text = "", anchor = "w")
+        self.status_label.grid(row = 1, column = 0, columnspan = 2, padx = 5, sticky = "w")
+        
+        # 背景工作 / 預覽視窗
+        self.task    = None
+        self.preview = None
+
         # 按鈕框架
         self.button_frame = ttk.Frame(self.root)
-        self.button_frame.place(x = 20, y = 340)
+        self.button_frame.place(x = 20, y = 395)
 
         # 創建按鈕
         self.run_button     = ttk.Button(self.button_frame, text = "執行", command = self.run_action,         width = 10)
@@ -540,110 +3075,222 @@ class UD7_HMI_App:
             self.latest_folder = self.folder_path
             self.update_listbox()
             
-            # 取代時間資料
+            # 取代時間資料 (只讀取檔案開頭與結尾)
             try:
-                Ori_data = CSV_Merge(self.latest_folder)
-                self.s_cal.set_date  (Ori_data[1][1][0:10])
-                self.s_hour_var.set  (int(Ori_data[1][1][11:13]))
-                self.s_minute_var.set(int(Ori_data[1][1][14:16]))
-                self.s_second_var.set(int(Ori_data[1][1][17:19]))
+                if not self.check_folder(self.latest_folder):
+                    return
+                
+                probe = CSV_Probe(self.latest_folder)
+                if probe is None:
+                    return
                 
-                end_hour = int(Ori_data[-1][1][11:13])
-                end_min  = int(Ori_data[-1][1][14:16])
-                end_sec  = int(Ori_data[-1][1][17:19])
+                print(f"資料夾資訊：{probe['files']} 個檔案，約 {probe['rows']} 筆資料，欄位：{', '.join(probe['channels'])}")
+                first_time = Time_text(probe["first"])
+                last_time  = Time_text(probe["last"])
+                
+                self.s_cal.set_date  (first_time[0:10])
+                self.s_hour_var.set  (int(first_time[11:13]))
+                self.s_minute_var.set(int(first_time[14:16]))
+                self.s_second_var.set(int(first_time[17:19]))
+                
+                end_hour = int(last_time[11:13])
+                end_min  = int(last_time[14:16])
+                end_sec  = int(last_time[17:19])
                 
                 if end_hour == 23 and end_min == 59 and end_sec == 59:
-                    end_date = datetime.strptime(Ori_data[-1][1][0:10], "%Y-%m-%d") + timedelta(days = 1)
+                    end_date = datetime.strptime(last_time[0:10], "%Y-%m-%d") + timedelta(days = 1)
                     self.e_cal.set_date  (end_date.date())
                     self.e_hour_var.set  (0)
                     self.e_minute_var.set(0)
                     self.e_second_var.set(0)
                     
                 else:
-                    self.e_cal.set_date  (Ori_data[-1][1][0:10])
+                    self.e_cal.set_date  (last_time[0:10])
                     self.e_hour_var.set  (end_hour)
                     self.e_minute_var.set(end_min)
                     self.e_second_var.set(end_sec + 1)
                 
             except Exception as e:
-                if len(Ori_data) > 0:
-                    print("錯誤發生：", e)
-                    messagebox.showerror("錯誤", "數據解析發生錯誤！\n\n請檢查檔案是否正確！")
+                print("錯誤發生：", e)
+                messagebox.showerror("錯誤", "數據解析發生錯誤！\n\n請檢查檔案是否正確！")
+
+    # 檢查資料夾內是否有CSV檔 (路徑)
+    def check_folder(self, folder):
+        if len(get_files_in_dir(folder)) == 0:
+            messagebox.showerror("錯誤", "⚠️資料夾路徑下，沒有.CSV檔存在！")
+            return False
+        return True
 
     # 清除Listbox的內容，並插入最新選擇的資料夾路徑    
     def update_listbox(self):
         self.listbox.delete(0, tk.END)
         self.listbox.insert(tk.END, self.latest_folder)             
     
+    # 選擇資料欄位 (時間資料 + 選擇欄位)
+    def selected_names(self):
+        names = ["Timestamp"]
+        
+        # 選擇頻率
+        if self.var_f.get(): 
+            names.append("FREQ")
+
+        # 選擇電流
+        if self.var_c.get(): 
+            names.append("IFB")
+
+        # 選擇功率
+        if self.var_p.get(): 
+            names.append("VFB")
+        
+        return names
+    
+    # 背景執行工作 (工作函式, 完成後函式)
+    def start_task(self, job, done):
+        if self.task is not None:
+            return
+        
+        task = Task_Control()
+        self.task = task
+        
+        # 工作中停用按鈕
+        for button in (self.run_button, self.drawing_button, self.browse_button):
+            button.config(state = "disabled")
+        self.cancel_button.config(state = "normal")
+        self.progress_var.set(0)
+        self.status_label.config(text = "處理中...")
+        
+        def worker():
+            try:
+                task.finish(result = job(task))
+            except BaseException as e:
+                task.finish(error = e)
+        
+        threading.Thread(target = worker, daemon = True).start()
+        self.root.after(100, self.poll_task, done)
+    
+    # 更新進度，工作結束後回到主執行緒處理結果 (完成後函式)
+    def poll_task(self, done):
+        task = self.task
+        
+        for stage, n, total in task.updates():
+            if total > 0:
+                self.progress_var.set(n / total * 100)
+                self.status_label.config(text = f"{stage} ({n}/{total})")
+            else:
+                self.status_label.config(text = stage)
+        
+        if not task.finished:
+            self.root.after(100, self.poll_task, done)
+            return
+        
+        # 恢復按鈕
+        self.task = None
+        for button in (self.run_button, self.drawing_button, self.browse_button):
+            button.config(state = "normal")
+        self.cancel_button.config(state = "disabled")
+        
+        if isinstance(task.error, Task_Cancelled):
+            self.progress_var.set(0)
+            self.status_label.config(text = "已取消")
+            
+        elif task.error is not None:
+            print("Error code:", task.error)
+            self.status_label.config(text = "發生錯誤")
+            
+        else:
+            self.progress_var.set(100)
+            self.status_label.config(text = "完成")
+            done(task.result)
+    
+    # 取消
+    def cancel_action(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.status_label.config(text = "取消中...")
+    
     # 執行
     def run_action(self):
         # 搜尋時間範圍
         Start_time, End_time = Search_time_gap(self.s_cal.get(), self.s_hour_var.get(), self.s_minute_var.get(), self.s_second_var.get(), 
                                                self.e_cal.get(), self.e_hour_var.get(), self.e_minute_var.get(), self.e_second_var.get())
-
-        # 取得合併的資料
-        all_data, ws_titles, UD7_Error = UD7_HMI(self.latest_folder, Start_time, End_time)
         
-        try:
+        # 選擇資料與路徑 (Tk變數只能在主執行緒讀取)
+        names  = self.selected_names()
+        folder = self.latest_folder
+        if not self.check_folder(folder):
+            return
+        
+        # 背景工作：取得合併的資料 → 建立Excel → 儲存
+        def job(task):
+            all_data, ws_titles, UD7_Error, end_kinds = UD7_HMI(folder, Start_time, End_time, task = task, ends = True)
+            
+            # 判斷是否有追頻紀錄與選擇資料
+            if all_data == [] or len(names) == 1:
+                return all_data, UD7_Error, False, None
+            
+            # 重取樣 (環境變數 UD7_RESAMPLE_MS 啟用) 與滑動視窗異常偵測 (環境變數 UD7_ANOMALY_Z 啟用)
+            with Profile_stage("Resample"):
+                all_data = Resample_tracks(all_data)
+            with Profile_stage("Anomaly"):
+                marks, ranges = Track_anomalies(all_data)
+            UD7_Error = UD7_Error + Anomaly_text(ranges)
+            
+            with Profile_stage("Column_select"):
+                sec_data = [{name: track[name] for name in names} for track in all_data]
+            with Profile_stage("Track_stats"):
+                stats = Track_stats(all_data, ws_titles, UD7_Error, end_kinds)
+            
+            # 儲存資料與統計表
+            tracks, titles, sources, parts = Excel_split(sec_data, ws_titles, marks)
+            with Profile_stage("Excel_file"):
+                wb = Excel_file(tracks, titles, colors, linetypes, task = task, summary = stats, marks = parts, sources = sources)
+            task.update("儲存Excel檔案")
+            try:
+                save_path = Excel_save(wb, folder)
+                Stats_csv(stats, Summary_path(save_path))
+                error = None
+            except Exception as e:
+                error = e
+            
+            return all_data, UD7_Error, True, error
+        
+        # 效能紀錄 (環境變數 UD7_PROFILE 啟用)，報告存於輸出檔旁
+        def profiled(task):
+            Profile_start()
+            try:
+                return job(task)
+            finally:
+                path = Profile_finish(Excel_save_path(folder))
+                if path is not None:
+                    print("效能紀錄：", path)
+        
+        # 顯示結果
+        def done(result):
+            all_data, UD7_Error, saved, error = result
+            
             # 判斷是否有追頻紀錄
-            if all_data != []:
+            if all_data == []:
+                log.warning("⚠️注意：未包含任何追頻資料！")
+                messagebox.showerror("錯誤", "⚠️數據未包含任何追頻資料！")
+                
+            # 判斷是否有選擇資料
+            elif not saved:
+                log.warning("⚠️注意：未選擇任何合併資料！")
+                messagebox.showerror("錯誤", "⚠️未選擇任何合併資料！")
                 
-                # 判斷是否有選擇資料
-                if self.var_p.get() == 1 or self.var_c.get() == 1 or self.var_f.get() == 1:
-                    # 建立選擇資料
-                    sec_data = []
-                    
-                    # 儲存時間資料
-                    for i1 in range(len(all_data)):
-                        sec_data.append([])
-                        for j1 in range(len(all_data[i1])):
-                            sec_data[i1].append([])
-                            sec_data[i1][j1].append(all_data[i1][j1][0])
-                    
-                    # 選擇頻率
-                    if self.var_f.get(): 
-                        for i2 in range(len(all_data)):
-                            for j2 in range(len(all_data[i2])):
-                                sec_data[i2][j2].append(all_data[i2][j2][1])
-
-                    # 選擇電流
-                    if self.var_c.get(): 
-                        for i3 in range(len(all_data)):
-                            for j3 in range(len(all_data[i3])):
-                                sec_data[i3][j3].append(all_data[i3][j3][2])
-
-                    # 選擇功率
-                    if self.var_p.get(): 
-                        for i4 in range(len(all_data)):
-                            for j4 in range(len(all_data[i4])):
-                                sec_data[i4][j4].append(all_data[i4][j4][3])
-                    
-                    # 資料確認點
-                    #print(sec_data)
-                    
-                    # 顯示錯誤
-                    if len(UD7_Error) > 0:
-                        Error_message = "錯誤項目：\n\n"
-                        for i5 in range(len(UD7_Error)):
-                            Error_message += str(i5 + 1) + str(". ") + UD7_Error[i5]
-                            if (i5 + 1) < len(UD7_Error):
-                                Error_message += str("\n\n")
-                        messagebox.showerror("追頻中發生錯誤", Error_message)
-                    
-                    # 儲存資料
-                    wb = Excel_file(sec_data, ws_titles, colors, linetypes)
-                    Save_Excel_file(wb, self.latest_folder)
-                    
-                else:
-                    print("⚠️注意：未選擇任何合併資料！")
-                    messagebox.showerror("錯誤", "⚠️未選擇任何合併資料！")
-
             else:
-                print("⚠️注意：未包含任何追頻資料！")
-                messagebox.showerror("錯誤", "⚠️數據未包含任何追頻資料！")
+                # 顯示錯誤
+                if len(UD7_Error) > 0:
+                    Error_message = "錯誤項目：\n\n"
+                    for i5 in range(len(UD7_Error)):
+                        Error_message += str(i5 + 1) + str(". ") + UD7_Error[i5]
+                        if (i5 + 1) < len(UD7_Error):
+                            Error_message += str("\n\n")
+                    messagebox.showerror("追頻中發生錯誤", Error_message)
                 
-        except Exception as e:
-            print("Error code:", e)
+                Save_Excel_message(error)
+        
+        self.start_task(profiled, done)
     
     # 預覽繪圖
     def Matplotlib_Drawing(self):
@@ -651,73 +3298,46 @@ class UD7_HMI_App:
             # 搜尋時間範圍
             Start_time, End_time = Search_time_gap(self.s_cal.get(), self.s_hour_var.get(), self.s_minute_var.get(), self.s_second_var.get(), 
                                                    self.e_cal.get(), self.e_hour_var.get(), self.e_minute_var.get(), self.e_second_var.get())
-                        
-            # 取得合併的資料
-            all_data, ws_titles, UD7_Error = UD7_HMI(self.latest_folder, Start_time, End_time)
+            folder = self.latest_folder
+            if not self.check_folder(folder):
+                return
             
-            if len(all_data) == 0:
-                print("⚠️注意：時間範圍內，未有任何資料！")
-                messagebox.showerror("無法預覽", "⚠️注意：時間範圍內，未有任何資料！")
-        
-            # 繪製每組資料
-            for i, dataset in enumerate(all_data):
-                timestamps, freq, ifb, vfb = extract_data(dataset)
-                
-                fig, ax1 = plt.subplots(figsize = (12, 6))
-                
-                SHOW = [[freq, dataset[0][1], " [Hz]", str("#" + colors[0])], 
-                        [ifb,  dataset[0][2], " [mA]", str("#" + colors[1])], 
-                        [vfb,  dataset[0][3], " [%]",  str("#" + colors[2])]]
-                
-                if self.var_p.get() == 0:
-                    del SHOW[2]
-                    
-                if self.var_c.get() == 0:
-                    del SHOW[1]
-                
-                if self.var_f.get() == 0:
-                    del SHOW[0]
-                
-                # 左側 Y 軸
-                ax1.plot(timestamps, SHOW[0][0], label = SHOW[0][1], color = SHOW[0][3], linestyle = "-", linewidth = 1)
-                ax1.set_xlabel(dataset[0][0])
-                ax1.set_ylabel(str(SHOW[0][1]+SHOW[0][2]), color = SHOW[0][3])
-                ax1.tick_params(axis = 'y', labelcolor = SHOW[0][3])
-                ax1.grid()
-                
-                if len(SHOW) >= 2:
-                    # 右側 Y 軸
-                    ax2 = ax1.twinx()
-                    ax2.plot(timestamps, SHOW[1][0], label = SHOW[1][1], color = SHOW[1][3], linewidth = 1)
-                    ax2.tick_params(axis = 'y', labelcolor = SHOW[1][3])
-                    ax2.set_ylabel(str(SHOW[1][1] + SHOW[1][2]), color = SHOW[1][3])
-                    
-                    if len(SHOW) == 3:
-                        ax2.plot(timestamps, SHOW[2][0], label = SHOW[2][1], color = SHOW[2][3], linewidth = 1)
-                        ax2.set_ylabel(str(SHOW[1][1] + SHOW[1][2] + "\n" + SHOW[2][1] + SHOW[2][2]), color = SHOW[1][3])
+            # 顯示欄位於開始時讀取 (背景工作期間可能變更勾選)
+            names = self.selected_names()[1:]
                         
-                    # 圖例
-                    ax2.legend(loc = "upper right")
-    
-                # 標題與圖例
-                fig.suptitle(ws_titles[i])
-                ax1.legend(loc = "upper left")
-
-                # 時間格式化
-                ax1.xaxis.set_major_formatter(DateFormatter('%Y-%m-%d %H:%M:%S'))
-                plt.tight_layout()
-                plt.show()
+            # 背景取得合併的資料，完成後繪圖
+            self.start_task(lambda task: UD7_HMI(folder, Start_time, End_time, task = task), lambda result: self.Matplotlib_show(result, names))
                 
         else:
-            print("⚠️注意：未選擇任何顯示資料！")
+            log.warning("⚠️注意：未選擇任何顯示資料！")
             messagebox.showerror("注意", "⚠️注意：未選擇任何顯示資料！")
+    
+    # 預覽繪圖 (切分結果, 顯示欄位)
+    def Matplotlib_show(self, result, names):
+        all_data, ws_titles, UD7_Error = result
+        
+        if len(all_data) == 0:
+            log.warning("⚠️注意：時間範圍內，未有任何資料！")
+            messagebox.showerror("無法預覽", "⚠️注意：時間範圍內，未有任何資料！")
+            return
+        
+        # 單一預覽視窗，重複使用
+        if self.preview is None or not self.preview.exists():
+            self.preview = Preview_Window(self.root)
+        self.preview.load(all_data, ws_titles, names)
 
     # 離開
     def close_action(self):
+        if self.task is not None:
+            self.task.cancel()
         self.root.destroy()
 
-# 運行主循環
+# 運行主循環 (有參數時為命令列模式)
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(CLI_main())
+    
+    Load_GUI()
     root = tk.Tk()
     app = UD7_HMI_App(root)
     root.mainloop()
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+# 滑動視窗異常偵測：突波位置、平坦訊號與短追頻
+
+import unittest
+
+import numpy as np
+
+from ud7 import UD7
+
+# 測試用追頻資料 (FREQ)，IFB / VFB 為固定值，每100ms一筆
+def make_track(FREQ, start = "2024-01-01T00:00:00"):
+    FREQ = np.asarray(FREQ, dtype = np.int32)
+    time = np.datetime64(start, "ms") + (np.arange(len(FREQ)) * 100).astype("timedelta64[ms]")
+    return {"Timestamp": time, "FREQ": FREQ, 
+            "IFB": np.full(len(FREQ), 400, dtype = np.int16), "VFB": np.full(len(FREQ), 50, dtype = np.int16)}
+
+# 小幅度固定雜訊 (-2 ~ +2)
+def noise(n):
+    return 20000 + (np.arange(n) * 7 % 5) - 2
+
+class Anomaly_test(unittest.TestCase):
+    def setUp(self):
+        self.window = 20
+        self.spike  = 70
+        values = noise(100)
+        values[self.spike] += 500
+        self.tracks = [make_track(noise(100)), make_track(values, "2024-01-01T01:00:00")]
+    
+    def test_spike_flagged(self):
+        marks, ranges = UD7.Track_anomalies(self.tracks, threshold = 5, window = self.window)
+        
+        # 只標記第二組追頻的FREQ突波位置
+        self.assertEqual(marks[0], {})
+        self.assertEqual(list(marks[1]), ["FREQ"])
+        np.testing.assert_array_equal(np.flatnonzero(marks[1]["FREQ"]), [self.spike])
+        
+        self.assertEqual(len(ranges), 1)
+        i, name, start, end, peak = ranges[0]
+        self.assertEqual((i, name), (1, "FREQ"))
+        self.assertEqual(start, self.tracks[1]["Timestamp"][self.spike])
+        self.assertEqual(end, start)
+        self.assertGreater(peak, 5)
+        self.assertEqual(len(UD7.Anomaly_text(ranges)), 1)
+    
+    def test_flat_signal(self):
+        flat = make_track(np.full(200, 20000))
+        self.assertEqual(UD7.Track_anomalies([flat], threshold = 3, window = self.window), ([{}], []))
+    
+    def test_short_track(self):
+        # 追頻筆數不超過視窗：前段資料不足，不判斷
+        values = noise(self.window)
+        values[-1] += 500
+        self.assertEqual(UD7.Track_anomalies([make_track(values)], threshold = 3, window = self.window), ([{}], []))
+        
+        # 突波位於前 window 筆內
+        values = noise(100)
+        values[self.window - 1] += 500
+        self.assertEqual(UD7.Track_anomalies([make_track(values)], threshold = 3, window = self.window), ([{}], []))
+    
+    def test_disabled(self):
+        self.assertEqual(UD7.Track_anomalies(self.tracks, threshold = 0, window = self.window), ([{}, {}], []))
+
+if __name__ == "__main__":
+    unittest.main()
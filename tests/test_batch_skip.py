@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+# 批次模式：輸入未變更時第二次轉換需略過 (輸出的統計表CSV不可改變資料夾指紋)，影響輸出的設定變更時需重新轉換
+
+import os
+import logging
+import tempfile
+import unittest
+
+from ud7 import UD7
+
+class Batch_skip_test(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache, UD7.Cache_dir = UD7.Cache_dir, ""
+        self.settings = (UD7.Chart_points, UD7.Lock_tolerance, UD7.Lock_window)
+        UD7.Session_cache.clear()
+        self.folder = os.path.join(self.tmp.name, "logs")
+        UD7.Bench_generate(self.folder, files = 2, rows = 5000, track_rows = 200)
+    
+    def tearDown(self):
+        UD7.Cache_dir = self.cache
+        UD7.Chart_points, UD7.Lock_tolerance, UD7.Lock_window = self.settings
+        self.tmp.cleanup()
+    
+    # 執行一次批次轉換 → 是否略過
+    def run_batch(self):
+        with self.assertLogs("UD7_HMI", logging.INFO) as logs:
+            self.assertEqual(UD7.UD7_batch([self.folder], workers = 1), UD7.Exit_ok)
+        return any("略過" in line for line in logs.output)
+    
+    def test_second_run_skipped(self):
+        self.assertFalse(self.run_batch())
+        self.assertTrue(os.path.exists(UD7.Summary_path(UD7.Excel_save_path(self.folder))))
+        self.assertTrue(self.run_batch())
+    
+    def test_setting_change_rebuilds(self):
+        self.assertFalse(self.run_batch())
+        
+        for name, value in [("Chart_points", 100), ("Lock_tolerance", 5.0), ("Lock_window", 7)]:
+            with self.subTest(setting = name):
+                setattr(UD7, name, value)
+                self.assertFalse(self.run_batch())
+                self.assertTrue(self.run_batch())
+
+if __name__ == "__main__":
+    unittest.main()
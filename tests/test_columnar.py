@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+# 欄式輸出：各檔案欄位型別固定，並保留追頻資訊中繼資料
+
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from ud7 import UD7
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+# 測試用追頻資料 (起始時間, 筆數, FREQ基準值)
+def make_track(start, n, base):
+    time = np.datetime64(start, "ms") + (np.arange(n) * 100).astype("timedelta64[ms]")
+    return {"Timestamp": time,
+            "FREQ": UD7.compact_int(np.full(n, base, dtype = np.int64)),
+            "IFB":  UD7.compact_int(np.arange(n, dtype = np.int64)),
+            "VFB":  UD7.compact_int(np.full(n, 50, dtype = np.int64))}
+
+@unittest.skipIf(pyarrow is None, "需要 pyarrow")
+class Columnar_test(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        # 第一組數值在int16範圍內，第二組需要int32
+        self.all_data  = [make_track("2024-01-01T00:00:00", 5, 20000), make_track("2024-01-01T01:00:00", 3, 40000)]
+        self.ws_titles = ["Track_A", "Track_B"]
+        self.errors    = ["驅動器追頻發生錯誤：2024-01-01 01:00:00.200"]
+        self.end_kinds = [UD7.Track_stop, UD7.Track_alarm]
+        self.assertNotEqual(self.all_data[0]["FREQ"].dtype, self.all_data[1]["FREQ"].dtype)
+    
+    def tearDown(self):
+        self.tmp.cleanup()
+    
+    def check_schema(self, table):
+        self.assertEqual(table.schema.field("segment").type, pyarrow.int32())
+        self.assertEqual(table.schema.field("Timestamp").type, pyarrow.timestamp("ms"))
+        for name in ["FREQ", "IFB", "VFB"]:
+            self.assertEqual(table.schema.field(name).type, pyarrow.int32())
+    
+    def test_single_file(self):
+        for fmt in UD7.Columnar_formats:
+            with self.subTest(fmt = fmt):
+                path = os.path.join(self.tmp.name, "out" + UD7.Columnar_formats[fmt])
+                UD7.Columnar_file(self.all_data, self.ws_titles, self.errors, self.end_kinds, path, fmt)
+                
+                table, info = UD7.Columnar_load(path)
+                self.check_schema(table)
+                self.assertEqual(table.column("segment").to_pylist(), [0] * 5 + [1] * 3)
+                self.assertEqual(table.column("FREQ").to_pylist(), [20000] * 5 + [40000] * 3)
+                self.assertEqual(info["errors"], self.errors)
+                self.assertEqual([segment["title"] for segment in info["segments"]], self.ws_titles)
+                self.assertEqual([segment["rows"] for segment in info["segments"]], [5, 3])
+                self.assertEqual(info["segments"][1]["error"], self.errors[0])
+    
+    def test_per_segment_same_schema(self):
+        folder = os.path.join(self.tmp.name, "out_parquet")
+        paths  = UD7.Columnar_file(self.all_data, self.ws_titles, self.errors, self.end_kinds, folder, "parquet", per_segment = True)
+        
+        tables = [UD7.Columnar_load(path) for path in paths]
+        self.assertEqual(len(tables), 2)
+        self.assertTrue(tables[0][0].schema.equals(tables[1][0].schema))
+        for n, (table, info) in enumerate(tables):
+            self.check_schema(table)
+            self.assertEqual(info["segments"][0]["title"], self.ws_titles[n])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+# 鎖頻品質分析：穩定時間、漂移率、抖動與IFB過衝
+
+import unittest
+
+import numpy as np
+
+from ud7 import UD7
+
+# 測試用追頻資料 (FREQ, IFB)，每100ms一筆
+def make_track(FREQ, IFB = None):
+    FREQ = np.asarray(FREQ, dtype = np.float64)
+    IFB  = np.full(len(FREQ), 400) if IFB is None else np.asarray(IFB)
+    time = np.datetime64("2024-01-01T00:00:00", "ms") + (np.arange(len(FREQ)) * 100).astype("timedelta64[ms]")
+    return {"Timestamp": time, "FREQ": FREQ, "IFB": IFB, "VFB": np.zeros(len(FREQ), dtype = np.int16)}
+
+class Lock_test(unittest.TestCase):
+    def setUp(self):
+        self.settle = 10 # 前10筆在穩定頻帶外
+        
+        # 穩定後以 0.5 Hz/s 線性漂移，IFB開頭過衝為穩定值的2倍
+        t = np.arange(200) * 0.1
+        ramp = np.where(np.arange(200) < self.settle, 19000, 20000 + 0.5 * t)
+        self.ramp = make_track(ramp, np.where(np.arange(200) < self.settle, 800, 400))
+        
+        # 穩定後 ±3 Hz 交替
+        jitter = np.where(np.arange(110) < self.settle, 19000, 20000 + 3 * (-1) ** np.arange(110))
+        self.jitter = make_track(jitter)
+        
+        # 穩定資料少於一個視窗
+        self.short = make_track([19000] * self.settle + [20000] * 5)
+        
+        # 未穩定：交替超出頻帶
+        self.unsettled = make_track([19000, 21000] * 4)
+    
+    def lock(self, tracks):
+        return UD7.Track_lock(tracks, tolerance = 20, window = 20)
+    
+    def test_settle_and_drift(self):
+        lock = self.lock([self.ramp])
+        self.assertAlmostEqual(lock["settle_s"][0], self.settle * 0.1)
+        self.assertAlmostEqual(lock["drift_Hz_s"][0], 0.5, places = 9)
+        self.assertAlmostEqual(lock["IFB_overshoot_pct"][0], 100.0)
+        
+        # 鎖定頻率為最後1/4資料的平均
+        self.assertAlmostEqual(lock["lock_FREQ"][0], self.ramp["FREQ"][150:].mean())
+    
+    def test_jitter(self):
+        lock = self.lock([self.jitter])
+        self.assertAlmostEqual(lock["settle_s"][0], self.settle * 0.1)
+        
+        # 每個20筆視窗為10筆 +3 與10筆 -3，樣本標準差為 3 * sqrt(20/19)
+        self.assertAlmostEqual(lock["jitter_Hz"][0], 3 * np.sqrt(20 / 19), places = 6)
+        self.assertLess(abs(lock["drift_Hz_s"][0]), 0.1)
+    
+    def test_short_steady_has_no_drift(self):
+        lock = self.lock([self.short])
+        self.assertAlmostEqual(lock["settle_s"][0], self.settle * 0.1)
+        self.assertTrue(np.isnan(lock["drift_Hz_s"][0]))
+        self.assertTrue(np.isnan(lock["jitter_Hz"][0]))
+    
+    def test_unsettled_and_empty(self):
+        empty = make_track([])
+        lock = self.lock([self.unsettled, empty, self.ramp])
+        for name in ["settle_s", "drift_Hz_s", "jitter_Hz", "IFB_overshoot_pct"]:
+            self.assertTrue(np.isnan(lock[name][0]), name)
+            self.assertTrue(np.isnan(lock[name][1]), name)
+        
+        # 與其他追頻一起計算時結果不變
+        self.assertAlmostEqual(lock["drift_Hz_s"][2], 0.5, places = 9)
+        self.assertAlmostEqual(lock["settle_s"][2], self.settle * 0.1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+# 重取樣：網格區間邊界、空區間與欄位型別 (以手算結果比對)
+
+import unittest
+
+import numpy as np
+
+from ud7 import UD7
+
+# 資料時間 (ms)：0, 30, 100, 200, 260, 499；週期100ms → 網格 0, 100, 200, 300, 400
+Times  = [0, 30, 100, 200, 260, 499]
+Values = [10, 20, 30, 40, 50, 60]
+Grid   = [0, 100, 200, 300, 400]
+
+def make_track(times = Times, values = Values):
+    start = np.datetime64("2024-01-01T00:00:00", "ms")
+    return {"Timestamp": start + np.asarray(times, dtype = np.int64).astype("timedelta64[ms]"),
+            "FREQ": np.asarray(values, dtype = np.int32),
+            "IFB":  np.asarray(values, dtype = np.int16) * 2}
+
+class Resample_test(unittest.TestCase):
+    def check_grid(self, result):
+        self.assertEqual(result["Timestamp"].dtype, np.dtype("datetime64[ms]"))
+        expected = np.datetime64("2024-01-01T00:00:00", "ms") + np.asarray(Grid).astype("timedelta64[ms]")
+        np.testing.assert_array_equal(result["Timestamp"], expected)
+    
+    def test_hold(self):
+        for chunk in (None, 2):
+            with self.subTest(chunk = chunk):
+                result = UD7.Track_resample(make_track(), 100, "hold", chunk)
+                self.check_grid(result)
+                
+                # 網格時間上的資料即取用 (區間左閉)，否則取前一筆
+                np.testing.assert_array_equal(result["FREQ"], [10, 30, 40, 50, 50])
+                np.testing.assert_array_equal(result["IFB"], [20, 60, 80, 100, 100])
+                self.assertEqual(result["FREQ"].dtype, np.int32)
+                self.assertEqual(result["IFB"].dtype, np.int16)
+    
+    def test_mean(self):
+        for chunk in (None, 2):
+            with self.subTest(chunk = chunk):
+                result = UD7.Track_resample(make_track(), 100, "mean", chunk)
+                self.check_grid(result)
+                
+                # [0,100): 10,20 / [100,200): 30 / [200,300): 40,50 / [300,400): 無資料，沿用前值50 / [400,500): 60
+                np.testing.assert_allclose(result["FREQ"], [15, 30, 45, 50, 60])
+                np.testing.assert_allclose(result["IFB"], [30, 60, 90, 100, 120])
+                self.assertEqual(result["FREQ"].dtype, np.float64)
+    
+    def test_linear(self):
+        result = UD7.Track_resample(make_track(), 100, "linear", 2)
+        self.check_grid(result)
+        np.testing.assert_allclose(result["FREQ"], [10, 30, 40, 50 + 10 * 40 / 239, 50 + 10 * 140 / 239])
+    
+    def test_empty_track(self):
+        empty = make_track([], [])
+        for method in UD7.Resample_methods:
+            with self.subTest(method = method):
+                result = UD7.Track_resample(empty, 100, method)
+                self.assertEqual(result["Timestamp"].dtype, np.dtype("datetime64[ms]"))
+                self.assertEqual(len(result["FREQ"]), 0)
+                self.assertEqual(result["FREQ"].dtype, np.int32 if method == "hold" else np.float64)
+
+if __name__ == "__main__":
+    unittest.main()
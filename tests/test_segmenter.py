@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+# 逐段切分：任意分段輸入的結果需與整批輸入相同 (含最後一筆為追頻起始點)
+
+import unittest
+
+import numpy as np
+
+from ud7 import UD7
+
+Header = ["No", "Time", "Level", "Source", "Code", "Description", "VFB", "IFB", "FREQ"]
+Idle   = "Status updated: ModeStatus=0. Errorcode=0"
+
+# 測試用資料列：正常停止 / 警報 / 模式切換 / 未送出停止命令 / 空追頻 / 最後一筆為追頻起始點
+def make_rows():
+    events = (["idle", "start"] + ["data"] * 5 + ["stop"] 
+              + ["idle", "start"] + ["data"] * 3 + ["alarm"] 
+              + ["start"] + ["data"] * 4 + ["start"] + ["data"] * 2 + ["mode"] 
+              + ["idle", "idle", "start", "stop"] 
+              + ["start"] + ["data"] * 6 + ["idle", "data"] 
+              + ["stop", "idle", "start"])
+    texts = {"idle": Idle, "start": UD7.StartTrack, "data": UD7.ModeStatus52, "stop": UD7.StopCommand, 
+             "alarm": UD7.UD7Alarm + ": Overcurrent", "mode": UD7.Mode_changed}
+    
+    rows = []
+    time = np.datetime64("2024-01-01T00:00:00.000", "ms")
+    for n, event in enumerate(events):
+        stamp = UD7.Time_text(time + np.timedelta64(n * 250, "ms"))
+        values = [str(n % 100), str(500 + n), str(20000 + n)] if event == "data" else ["", "", ""]
+        rows.append([str(n + 1), stamp, "I", "HMI", "0", texts[event]] + values)
+    return rows
+
+# 切分 (資料列, 每段筆數, 起始時間, 終止時間) → 全部資料, 分頁名稱, 錯誤訊息, 結束事件
+def segment(rows, chunk, Start_time, End_time):
+    segmenter = UD7.Track_Segmenter(Start_time, End_time)
+    for n in range(0, len(rows), chunk):
+        segmenter.feed(UD7.UD7_Table.from_rows(Header, rows[n:n + chunk]))
+    all_data, ws_titles, UD7_Error = segmenter.finish()
+    return all_data, ws_titles, UD7_Error, segmenter.end_kinds
+
+class Segmenter_test(unittest.TestCase):
+    def setUp(self):
+        self.rows = make_rows()
+        self.ranges = [("2024-01-01T00:00:00", "2024-01-01T01:00:00"),   # 全部
+                       ("2024-01-01T00:00:02", "2024-01-01T00:00:07")]   # 部分追頻起始點在範圍外
+    
+    def assert_same(self, result, expected):
+        all_data, ws_titles, UD7_Error, end_kinds = result
+        self.assertEqual(ws_titles, expected[1])
+        self.assertEqual(UD7_Error, expected[2])
+        self.assertEqual(end_kinds, expected[3])
+        self.assertEqual(len(all_data), len(expected[0]))
+        for track, reference in zip(all_data, expected[0]):
+            self.assertEqual(list(track), list(reference))
+            for name in track:
+                np.testing.assert_array_equal(track[name], reference[name])
+    
+    def test_chunked_feed_matches_single_feed(self):
+        for Start_time, End_time in self.ranges:
+            expected = segment(self.rows, len(self.rows), Start_time, End_time)
+            for chunk in (1, 2, 7):
+                with self.subTest(chunk = chunk, start = Start_time):
+                    self.assert_same(segment(self.rows, chunk, Start_time, End_time), expected)
+    
+    def test_start_on_last_row(self):
+        all_data, ws_titles, UD7_Error, end_kinds = segment(self.rows, len(self.rows), *self.ranges[0])
+        
+        # 最後一筆為追頻起始點：空追頻，分頁名稱取自該筆時間，資料結束時結束
+        self.assertEqual(len(all_data[-1]["Timestamp"]), 0)
+        self.assertEqual(ws_titles[-1], UD7.Track_title(UD7.Parse_timestamps([self.rows[-1][1]])[0]))
+        self.assertIsNone(end_kinds[-1])
+        self.assertEqual(len(ws_titles), len(all_data))
+        
+        # 正常停止 / 警報 / 未正常關閉 / 模式切換 / 正常停止 / 正常停止 / 資料結束
+        self.assertEqual(end_kinds, [UD7.Track_stop, UD7.Track_alarm, UD7.Track_start, UD7.Track_mode, UD7.Track_stop, UD7.Track_stop, None])
+        self.assertEqual([len(track["Timestamp"]) for track in all_data], [5, 3, 4, 2, 0, 7, 0])
+        self.assertEqual(len(UD7_Error), 3)
+
+if __name__ == "__main__":
+    unittest.main()
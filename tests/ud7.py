@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+# 測試用：載入主程式 (檔名含空白與括號，無法直接 import)
+
+import os
+import sys
+import importlib.util
+
+Script = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "UD7_HMI_convert_v1.2.5 (UI).py")
+
+if "UD7_HMI_convert" in sys.modules:
+    UD7 = sys.modules["UD7_HMI_convert"]
+else:
+    spec = importlib.util.spec_from_file_location("UD7_HMI_convert", Script)
+    UD7 = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = UD7
+    spec.loader.exec_module(UD7)